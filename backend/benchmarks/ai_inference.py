@@ -0,0 +1,129 @@
+"""Benchmark async_inference end to end against the local mock AI provider.
+
+Runs the real inference path in-process (image preparation, scheduling,
+retries, response parsing and DB writes) with the mock provider from
+pyaquarius/ai_mock.py, and reports analyses/sec and per-request latency at
+each concurrency level:
+
+    python benchmarks/ai_inference.py --concurrency 1,4,16 --requests 64
+    python benchmarks/ai_inference.py --analyses identify_life,estimate_temperature --no-batch
+    python benchmarks/ai_inference.py --error-rate 0.1 --latency-ms 1500 --sigma 1.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def configure_env(args: argparse.Namespace, workdir: str) -> None:
+    """Point the backend at a scratch data dir and the mock provider before importing it."""
+    os.environ['DATA_DIR'] = workdir
+    os.environ['IMAGES_DIR'] = os.path.join(workdir, 'images')
+    os.environ['DATABASE_DIR'] = os.path.join(workdir, 'db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'db', 'bench.db')}"
+    os.environ['AI_MOCK_ENABLED'] = 'true'
+    os.environ['AI_MOCK_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['AI_MOCK_LATENCY_SIGMA'] = str(args.sigma)
+    os.environ['AI_MOCK_ERROR_RATE'] = str(args.error_rate)
+    os.environ['AI_MOCK_TIMEOUT_RATE'] = str(args.timeout_rate)
+    os.environ['AI_MOCK_SEED'] = str(args.seed)
+    os.environ['AI_API_TIMEOUT'] = str(args.timeout)
+    os.environ['AI_CACHE_ENABLED'] = 'true' if args.cache else 'false'
+    os.environ['AI_BATCH_ANALYSES'] = 'false' if args.no_batch else 'true'
+    os.environ['AI_CONCURRENCY'] = f"mock:{args.provider_concurrency}"
+    os.environ['AI_RATE_LIMITS'] = f"mock:{args.rate_limit}"
+
+
+def create_images(count: int, width: int, height: int) -> list:
+    """Write synthetic captures and their DB rows, returns (image_id, filepath) pairs."""
+    import cv2
+    from pyaquarius.models import DBImage, IMAGES_DIR, get_db_session
+    from pyaquarius.sources import SyntheticSource
+
+    source = SyntheticSource(width, height, fps=1000)
+    images = []
+    with get_db_session() as db:
+        for i in range(count):
+            _, frame = source.read()
+            filepath = os.path.join(IMAGES_DIR, f"bench_{i}.jpg")
+            cv2.imwrite(filepath, frame)
+            image_id = f"bench_{i}"
+            db.add(DBImage(id=image_id, device_index=0, filepath=filepath, width=width, height=height,
+                           file_size=os.path.getsize(filepath)))
+            images.append((image_id, filepath))
+    return images
+
+
+async def bench(images: list, analyses: list, concurrency: int, requests: int, first_wins: bool) -> None:
+    from pyaquarius.ai import async_inference
+
+    latencies = []
+    errors = 0
+    next_request = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in next_request:
+            image_id, filepath = images[i % len(images)]
+            t0 = time.perf_counter()
+            results = await async_inference(['mock'], analyses, filepath, tank_id=0, image_id=image_id, first_wins=first_wins)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += sum(1 for result in results.values() if 'error' in str(result).lower())
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    print(f"concurrency={concurrency:<3} analyses/s={requests * len(analyses) / elapsed:7.2f} "
+          f"p50={statistics.median(latencies):8.1f}ms p99={p99:8.1f}ms errors={errors}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    from pyaquarius import ai_cache, ai_scheduler
+
+    images = create_images(args.images, args.width, args.height)
+    analyses = args.analyses.split(',')
+    print(f"mock latency {args.latency_ms}ms sigma {args.sigma}, error rate {args.error_rate}, "
+          f"analyses {analyses}, batch {not args.no_batch}, first wins {args.first_wins}")
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        await bench(images, analyses, concurrency, args.requests, args.first_wins)
+    gate = ai_scheduler.metrics().get('mock', {})
+    print(f"provider wait: {gate.get('wait', {})}")
+    if args.cache:
+        print(f"cache: {ai_cache.response_cache.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated numbers of concurrent requests to test')
+    parser.add_argument('--requests', type=int, default=32, help='async_inference calls per concurrency level')
+    parser.add_argument('--analyses', default='identify_life', help='Comma-separated analyses per request')
+    parser.add_argument('--images', type=int, default=8, help='Distinct synthetic images to cycle through')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--latency-ms', type=float, default=800, help='Median mock provider latency')
+    parser.add_argument('--sigma', type=float, default=0.5, help='Log-normal latency spread')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of mock calls returning an API error')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='Share of mock calls hanging past --timeout')
+    parser.add_argument('--timeout', type=int, default=30, help='AI_API_TIMEOUT in seconds')
+    parser.add_argument('--provider-concurrency', type=int, default=64, help='Mock provider concurrency cap')
+    parser.add_argument('--rate-limit', type=float, default=0, help='Mock provider requests per minute, 0 for no limit')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cache', action='store_true', help='Keep the AI response cache enabled')
+    parser.add_argument('--no-batch', action='store_true', help='One call per analysis instead of batched prompts')
+    parser.add_argument('--first-wins', action='store_true', help='Use first-wins racing')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(args, workdir)
+        asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark stream fan-out and capture throughput against software camera sources.
+
+Runs the real CameraManager in-process on synthetic, video file or image
+directory sources, so results are reproducible without camera hardware:
+
+    python benchmarks/camera_pipeline.py --source synthetic:1280x720@30 --clients 1,2,4,8
+    python benchmarks/camera_pipeline.py --source file:/path/to/tank.mp4 --captures 50 --burst 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def configure_env(source: str, workdir: str) -> None:
+    """Point the backend at a scratch data dir and the requested source before importing it."""
+    os.environ['DATA_DIR'] = workdir
+    os.environ['IMAGES_DIR'] = os.path.join(workdir, 'images')
+    os.environ['DATABASE_DIR'] = os.path.join(workdir, 'db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'db', 'bench.db')}"
+    os.environ['CAMERA_DEVICES'] = ''
+    os.environ['CAMERA_SOURCES'] = f'0={source}'
+
+
+async def bench_fanout(manager, device, clients: int, duration: float) -> None:
+    received = [0] * clients
+
+    async def client(i: int) -> None:
+        async for _ in manager.generate_frames(device):
+            received[i] += 1
+
+    dropped_before = device.grabber.dropped_frames
+    cpu_before = time.process_time()
+    tasks = [asyncio.create_task(client(i)) for i in range(clients)]
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    cpu = time.process_time() - cpu_before
+    total = sum(received)
+    metrics = device.metrics()
+    encode = metrics['stages'].get('encode', {})
+    print(f"clients={clients:<3} fps/client={total / clients / duration:6.1f} "
+          f"read_fps={metrics['achieved_fps']:6.1f} cpu/s={cpu / duration:5.2f} "
+          f"encode_p50={encode.get('p50_ms', 0):6.2f}ms dropped={device.grabber.dropped_frames - dropped_before}")
+
+
+async def bench_capture(manager, device, captures: int, burst: int) -> None:
+    latencies = []
+    started = time.perf_counter()
+    for i in range(captures):
+        t0 = time.perf_counter()
+        result = await manager.capture_image(device, f"bench_{i}.jpg", after=time.time(), burst=burst)
+        if result is None:
+            print(f"capture {i} failed")
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    print(f"captures={len(latencies)} burst={burst} rate={len(latencies) / elapsed:.2f}/s "
+          f"p50={statistics.median(latencies):.1f}ms p99={p99:.1f}ms")
+
+
+async def run(args: argparse.Namespace) -> None:
+    from pyaquarius.camera import CameraManager
+
+    manager = CameraManager()
+    await manager.initialize()
+    await manager.wait_ready()
+    device = manager.get_device(0)
+    if not device:
+        raise SystemExit(f"Source {args.source} failed to open")
+    print(f"source {args.source}: {device.width}x{device.height}")
+
+    for clients in [int(c) for c in args.clients.split(',')]:
+        await bench_fanout(manager, device, clients, args.duration)
+    if args.captures:
+        await bench_capture(manager, device, args.captures, args.burst)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic:1280x720@30', help='Camera source spec, see pyaquarius/sources.py')
+    parser.add_argument('--clients', default='1,2,4,8', help='Comma-separated stream client counts to test')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per fan-out run')
+    parser.add_argument('--captures', type=int, default=20, help='Number of sequential captures, 0 to skip')
+    parser.add_argument('--burst', type=int, default=1, help='Frames per burst capture')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(args.source, workdir)
+        asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
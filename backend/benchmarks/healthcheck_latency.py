@@ -0,0 +1,75 @@
+"""Measure /healthcheck latency while MJPEG streams are open on the backend.
+
+Run against a live backend, once on the commit before the camera executor
+change and once after, and compare the reported p50/p99:
+
+    python benchmarks/healthcheck_latency.py --url http://127.0.0.1:8000 --devices 0,4
+"""
+import argparse
+import statistics
+import threading
+import time
+from typing import List
+
+import requests
+
+
+def consume_stream(url: str, stop: threading.Event, frames: List[int]) -> None:
+    """Read an MJPEG stream until stopped, counting frame boundaries."""
+    try:
+        with requests.get(url, stream=True, timeout=10) as response:
+            for chunk in response.iter_content(chunk_size=65536):
+                frames[0] += chunk.count(b'--frame')
+                if stop.is_set():
+                    break
+    except requests.RequestException as e:
+        print(f"stream {url} failed: {e}")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Backend base URL')
+    parser.add_argument('--devices', default='0,4', help='Comma-separated camera indices to stream')
+    parser.add_argument('--requests', type=int, default=500, help='Number of healthcheck requests')
+    parser.add_argument('--interval', type=float, default=0.02, help='Seconds between healthcheck requests')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Seconds to let streams settle before measuring')
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    counters = {}
+    threads = []
+    for idx in [d.strip() for d in args.devices.split(',') if d.strip()]:
+        counters[idx] = [0]
+        thread = threading.Thread(
+            target=consume_stream,
+            args=(f"{args.url}/camera/{idx}/stream", stop, counters[idx]),
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    time.sleep(args.warmup)
+
+    latencies = []
+    session = requests.Session()
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        t0 = time.perf_counter()
+        session.get(f"{args.url}/healthcheck", timeout=10).raise_for_status()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        time.sleep(args.interval)
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    print(f"streams: {len(threads)}  healthcheck requests: {len(latencies)}")
+    print(f"p50: {statistics.median(latencies):.2f} ms  p99: {percentile(latencies, 99):.2f} ms  max: {max(latencies):.2f} ms")
+    for idx, count in counters.items():
+        print(f"camera {idx}: {count[0] / elapsed:.1f} fps received")
+
+
+if __name__ == '__main__':
+    main()
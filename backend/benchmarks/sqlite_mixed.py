@@ -0,0 +1,153 @@
+"""Benchmark mixed SQLite reads and writes with and without performance mode.
+
+Writer threads insert images, analyses and readings the way captures and AI
+analyses do, while reader threads run the dashboard's polling queries. Each
+mode gets a fresh database file, and the script reports throughput, latency
+and lock errors for both:
+
+    python benchmarks/sqlite_mixed.py --writers 4 --readers 8 --seconds 10
+    python benchmarks/sqlite_mixed.py --modes performance --seed-rows 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def configure_env(workdir: str) -> None:
+    """Keep the backend's own database in the scratch dir, the benchmark builds its own engines."""
+    os.environ['DATA_DIR'] = workdir
+    os.environ['IMAGES_DIR'] = os.path.join(workdir, 'images')
+    os.environ['DATABASE_DIR'] = os.path.join(workdir, 'db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'db', 'aquarius.db')}"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def seed(session_factory, rows: int) -> None:
+    from pyaquarius.models import DBImage, DBReading
+    now = datetime.utcnow()
+    with session_factory() as db:
+        for i in range(rows):
+            timestamp = now - timedelta(seconds=rows - i)
+            db.add(DBImage(id=f"seed_{i}", device_index=i % 2, timestamp=timestamp, filepath=f"/tmp/seed_{i}.jpg",
+                           width=1920, height=1080, file_size=250000))
+            db.add(DBReading(id=f"seed_{i}", timestamp=timestamp, temperature_f=78.0, temperature_c=25.6, tank_id=0))
+        db.commit()
+
+
+def write_once(session_factory) -> None:
+    """One capture: image row, then an analysis and a reading in a second transaction."""
+    from pyaquarius.models import DBAIAnalysis, DBImage, DBReading
+    image_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    with session_factory() as db:
+        db.add(DBImage(id=image_id, device_index=0, timestamp=now, filepath=f"/tmp/{image_id}.jpg",
+                       width=1920, height=1080, file_size=250000))
+        db.commit()
+    with session_factory() as db:
+        db.add(DBAIAnalysis(id=uuid.uuid4().hex, image_id=image_id, tank_id=0, timestamp=now, ai_model='mock',
+                            analysis='estimate_temperature', response='temperature_f: 78.0\ntemperature_c: 25.6'))
+        db.add(DBReading(id=uuid.uuid4().hex, timestamp=now, temperature_f=78.0, temperature_c=25.6, tank_id=0,
+                         image_id=image_id))
+        db.commit()
+
+
+def read_once(session_factory) -> None:
+    """The dashboard's polling: latest image per device, latest reading and the last day of readings."""
+    from pyaquarius.models import DBImage, DBReading
+    since = datetime.utcnow() - timedelta(hours=24)
+    with session_factory() as db:
+        for device_index in (0, 1):
+            db.query(DBImage).filter(DBImage.device_index == device_index).order_by(DBImage.timestamp.desc()).first()
+        db.query(DBReading).order_by(DBReading.timestamp.desc()).first()
+        db.query(DBReading).filter(DBReading.timestamp >= since).order_by(DBReading.timestamp.asc()).limit(500).all()
+
+
+def run_mode(mode: str, workdir: str, args: argparse.Namespace) -> Dict[str, float]:
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+    from pyaquarius.db import create_engines
+    from pyaquarius.models import Base
+
+    url = f"sqlite:///{os.path.join(workdir, f'{mode}.db')}"
+    writer, reader = create_engines(url, performance=mode == 'performance')
+    Base.metadata.create_all(bind=writer)
+    write_sessions = sessionmaker(bind=writer)
+    read_sessions = sessionmaker(bind=reader)
+    seed(write_sessions, args.seed_rows)
+
+    latencies: Dict[str, List[float]] = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    stop = threading.Event()
+
+    def loop(kind: str, fn, session_factory) -> None:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                fn(session_factory)
+                latencies[kind].append((time.perf_counter() - t0) * 1000)
+            except OperationalError:
+                # "database is locked" once the busy timeout runs out
+                errors[kind] += 1
+
+    threads = [threading.Thread(target=loop, args=('write', write_once, write_sessions)) for _ in range(args.writers)]
+    threads += [threading.Thread(target=loop, args=('read', read_once, read_sessions)) for _ in range(args.readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    writer.dispose()
+    reader.dispose()
+
+    return {
+        'writes/s': len(latencies['write']) / elapsed,
+        'reads/s': len(latencies['read']) / elapsed,
+        'write p50': statistics.median(latencies['write']) if latencies['write'] else 0.0,
+        'write p99': percentile(latencies['write'], 99),
+        'read p50': statistics.median(latencies['read']) if latencies['read'] else 0.0,
+        'read p99': percentile(latencies['read'], 99),
+        'write errors': errors['write'],
+        'read errors': errors['read'],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='legacy,performance', help='Comma-separated modes to compare')
+    parser.add_argument('--writers', type=int, default=4, help='Concurrent writer threads')
+    parser.add_argument('--readers', type=int, default=8, help='Concurrent reader threads')
+    parser.add_argument('--seconds', type=float, default=10, help='Duration of each mode')
+    parser.add_argument('--seed-rows', type=int, default=20000, help='Images and readings in the database before the run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir)
+        print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s per mode, {args.seed_rows} seeded rows")
+        for mode in args.modes.split(','):
+            result = run_mode(mode, workdir, args)
+            print(f"{mode:<12} writes/s={result['writes/s']:8.1f} reads/s={result['reads/s']:8.1f} "
+                  f"write p50/p99={result['write p50']:6.1f}/{result['write p99']:7.1f}ms "
+                  f"read p50/p99={result['read p50']:6.1f}/{result['read p99']:7.1f}ms "
+                  f"errors w/r={result['write errors']}/{result['read errors']}")
+
+
+if __name__ == '__main__':
+    main()
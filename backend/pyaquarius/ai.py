@@ -1,17 +1,23 @@
 import asyncio
-import base64
 import csv
 import logging
 import os
 import re
+import time
 from datetime import datetime, timezone
 from functools import wraps
-from typing import Any, Callable, Dict, List, Optional
-import json
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
-from pyaquarius.models import DBAIAnalysis, DBImage, DBLife, DBReading, get_db_session
+from pyaquarius import ai_mock
+from pyaquarius.ai_breaker import CircuitOpenError, get_breaker
+from pyaquarius.ai_cache import AI_CACHE_ENABLED, response_cache
+from pyaquarius.ai_image import PreparedImage, prepare_image
+from pyaquarius.ai_scheduler import PRIORITY_INTERACTIVE, provider_slot
+from pyaquarius.ai_uploads import gemini_uploads, is_missing_file_error
+from pyaquarius.life_index import life_index
+from pyaquarius.models import DBAIAnalysis, DBImage, DBLife, DBReading, get_db_session, record_sightings
 
 log = logging.getLogger(__name__)
 
@@ -19,10 +25,24 @@ log = logging.getLogger(__name__)
 AI_API_TIMEOUT: int = int(os.getenv('AI_API_TIMEOUT', '30'))
 AI_API_MAX_RETRIES: int = int(os.getenv('AI_API_MAX_RETRIES', '3'))
 AI_MAX_TOKENS: int = int(os.getenv('AI_MAX_TOKENS', '256'))
+AI_BATCH_ANALYSES: bool = os.getenv('AI_BATCH_ANALYSES', 'true').lower() == 'true'  # One call per model for all requested analyses
+AI_HEDGE_DELAY: float = float(os.getenv('AI_HEDGE_DELAY', '0'))  # Seconds before each further model joins a first-wins race, 0 starts all at once
+AI_HEDGE_KEEP_OTHERS: bool = os.getenv('AI_HEDGE_KEEP_OTHERS', 'false').lower() == 'true'  # Let losing models finish and record them in the background
 ENABLED_MODELS: List[str] = []
+AI_MODEL_VERSIONS: Dict[str, str] = {
+    'claude': 'claude-3-sonnet-20240229',
+    'gpt': 'gpt-4o-mini',
+    'gemini': 'gemini-1.5-flash',
+    'mock': 'mock',
+}
+API_ERROR_PATTERN = re.compile(r'^\w+ API error: ')
+
+def is_error_response(response: Optional[str]) -> bool:
+    """True for the provider and database error strings stored in place of an answer."""
+    return not response or bool(API_ERROR_PATTERN.match(response)) or response.startswith('Database error')
 
 try:
-    from anthropic import Anthropic
+    from anthropic import AsyncAnthropic
     if os.getenv('ANTHROPIC_API_KEY'):
         ENABLED_MODELS.append('claude')
     else:
@@ -31,7 +51,7 @@ except ImportError:
     log.warning("anthropic module not installed - Claude service will be unavailable")
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
     if os.getenv('OPENAI_API_KEY'):
         ENABLED_MODELS.append('gpt')
     else:
@@ -48,18 +68,51 @@ try:
 except ImportError:
     log.warning("google-generativeai module not installed - Gemini service will be unavailable")
 
+if ai_mock.AI_MOCK_ENABLED:
+    ENABLED_MODELS.append('mock')
+    log.warning("AI_MOCK_ENABLED set - mock AI provider available")
 
+# Provider clients live for the whole process so their HTTP connection pools and
+# keep-alive are shared by every call, created on first use
+_clients: Dict[str, Any] = {}
 
-def encode_image(image_path: str) -> str:
-    """Encode image to base64 string."""
-    if not os.path.exists(image_path):
-        raise ValueError(f"Image file not found: {image_path}")
-    
-    try:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
-    except Exception as e:
-        raise ValueError(f"Failed to encode image: {str(e)}")
+def get_client(ai_model: str) -> Any:
+    """Return the process-wide async client for a provider, creating it on first use."""
+    client = _clients.get(ai_model)
+    if client is not None:
+        return client
+    if ai_model == 'claude':
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise ValueError("ANTHROPIC_API_KEY not set")
+        client = AsyncAnthropic(api_key=api_key)
+    elif ai_model == 'gpt':
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not set")
+        client = AsyncOpenAI(api_key=api_key)
+    elif ai_model == 'gemini':
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not set")
+        genai.configure(api_key=api_key)
+        client = genai.GenerativeModel(model_name=AI_MODEL_VERSIONS['gemini'])
+    else:
+        raise ValueError(f"No client for model {ai_model}")
+    log.info(f"Created {ai_model} API client")
+    _clients[ai_model] = client
+    return client
+
+async def close_clients() -> None:
+    """Close pooled provider connections, called on shutdown."""
+    for ai_model, client in list(_clients.items()):
+        close = getattr(client, 'close', None)
+        if close is not None:
+            try:
+                await close()
+            except Exception as e:
+                log.warning(f"Error closing {ai_model} client: {str(e)}")
+    _clients.clear()
 
 def ai_retry_decorator(func: Callable[..., Any]) -> Callable[..., Any]:
     @retry(
@@ -78,20 +131,15 @@ def ai_retry_decorator(func: Callable[..., Any]) -> Callable[..., Any]:
     return wrapper
 
 @ai_retry_decorator
-async def claude(prompt: str, image_path: str) -> str:
+async def claude(prompt: str, image: PreparedImage, max_tokens: int = AI_MAX_TOKENS) -> str:
     """Call Claude 3.5 Sonnet API with image."""
     try:
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY not set")
-        base64_image = encode_image(image_path)
-        client = Anthropic(api_key=api_key)
+        client = get_client('claude')
         log.info("Calling Claude API")
         log.debug(f"\n---prompt - claude 3.5 sonnet\n {prompt}\n---\n")
-        response = await asyncio.to_thread(
-            client.messages.create,
-            model="claude-3-sonnet-20240229",
-            max_tokens=AI_MAX_TOKENS,
+        response = await client.messages.create(
+            model=AI_MODEL_VERSIONS['claude'],
+            max_tokens=max_tokens,
             messages=[{
                 "role": "user",
                 "content": [
@@ -101,7 +149,7 @@ async def claude(prompt: str, image_path: str) -> str:
                         "source": {
                             "type": "base64",
                             "media_type": "image/jpeg",
-                            "data": base64_image,
+                            "data": image.base64,
                         },
                     },
                 ],
@@ -116,20 +164,15 @@ async def claude(prompt: str, image_path: str) -> str:
         return f"Claude API error: {str(e)}"
 
 @ai_retry_decorator
-async def gpt(prompt: str, image_path: str) -> str:
+async def gpt(prompt: str, image: PreparedImage, max_tokens: int = AI_MAX_TOKENS) -> str:
     """Call GPT API with image and prompt."""
     try:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not set")
-        client = OpenAI(api_key=api_key)
-        base64_image = encode_image(image_path)
+        client = get_client('gpt')
         log.info("Calling GPT API")
         log.debug(f"\n---prompt - gpt-4o-mini\n {prompt}\n---\n")
-        response = await asyncio.to_thread(
-            client.chat.completions.create,
-            model="gpt-4o-mini",
-            max_tokens=AI_MAX_TOKENS,
+        response = await client.chat.completions.create(
+            model=AI_MODEL_VERSIONS['gpt'],
+            max_tokens=max_tokens,
             messages=[
                 {
                     "role": "user",
@@ -137,7 +180,7 @@ async def gpt(prompt: str, image_path: str) -> str:
                         {"type": "text", "text": prompt},
                         {
                             "type": "image_url",
-                            "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
+                            "image_url": {"url": f"data:image/jpeg;base64,{image.base64}"}
                         },
                     ],
                 }
@@ -153,21 +196,16 @@ async def gpt(prompt: str, image_path: str) -> str:
         return f"GPT API error: {str(e)}"
 
 @ai_retry_decorator
-async def gemini(prompt: str, image_path: str) -> str:
+async def gemini(prompt: str, image: PreparedImage, max_tokens: int = AI_MAX_TOKENS) -> str:
     """Call Google Gemini API with image using the File API."""
     try:
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not set")
-        genai.configure(api_key=api_key)
-        uploaded_file = genai.upload_file(image_path)
-        log.info(f"Uploaded file to Gemini: {uploaded_file.uri}")
-        model = genai.GenerativeModel(model_name='gemini-1.5-flash')
+        model = get_client('gemini')
+        file_part = await gemini_uploads.file_part(image)
         log.debug(f"\n---prompt - gemini 1.5 flash\n {prompt}\n---\n")
         response = await model.generate_content_async(
-            [uploaded_file, "\n\n", prompt],
+            [file_part, "\n\n", prompt],
             request_options={"timeout": 600},
-            generation_config={"max_output_tokens": AI_MAX_TOKENS},
+            generation_config={"max_output_tokens": max_tokens},
         )
         response = response.text
         log.info("Gemini API responded")
@@ -176,195 +214,428 @@ async def gemini(prompt: str, image_path: str) -> str:
 
     except Exception as e:
         log.error(f"Gemini API error: {str(e)}")
+        # Upload again next time only if the file itself is gone, not on rate limits or timeouts
+        if is_missing_file_error(e):
+            gemini_uploads.forget(image.digest)
         return f"Gemini API error: {str(e)}"
 
+@ai_retry_decorator
+async def mock(prompt: str, image: PreparedImage, max_tokens: int = AI_MAX_TOKENS) -> str:
+    """Answer from the local stand-in provider with simulated latency and failures."""
+    outcome = ai_mock.outcome()
+    log.debug(f"Calling mock API with {len(image.base64)} base64 bytes")
+    if outcome == 'timeout':
+        await asyncio.sleep(AI_API_TIMEOUT + 1)
+    await asyncio.sleep(ai_mock.latency())
+    if outcome == 'error':
+        log.error("Mock API error: injected failure")
+        return "Mock API error: injected failure"
+    return ai_mock.answer(prompt)
+
 AI_MODEL_MAP: Dict[str, callable] = {
     'claude': claude,
     'gpt': gpt,
-    'gemini': gemini
+    'gemini': gemini,
+    'mock': mock
 }
 
-async def async_identify_life(ai_model: str, image_path: str, tank_id: int, image_id: Optional[str] = None) -> Dict[str, str]:
-    log.debug(f"Starting life identification with {ai_model} model")
-    if not os.path.exists(image_path):
-        log.error(f"Image file not found at {image_path}")
-        return f"Error: Image file not found"
-    
-    expected_headers = ['emoji', 'common_name', 'scientific_name']
-    header_str = ','.join(expected_headers)
-    
-    prompt = f"""Return ONLY a CSV with fish, invertebrates, and plants that are CLEARLY VISIBLE in this underwater aquarium image.
+async def call_model(ai_model: str, prompt: str, image_path: str, priority: int = PRIORITY_INTERACTIVE,
+                     max_tokens: int = AI_MAX_TOKENS) -> Tuple[str, bool]:
+    """Call a model through the response cache, returns the response and whether it was cached."""
+    image = await prepare_image(image_path, ai_model)
+    key = None
+    if AI_CACHE_ENABLED:
+        # Keyed on the prepared upload so changing crop or downscale settings is a miss
+        key = response_cache.key(AI_MODEL_VERSIONS.get(ai_model, ai_model), prompt, image.digest)
+        cached = response_cache.get(key)
+        if cached is not None:
+            log.info(f"Using cached {ai_model} response for {image_path}")
+            return cached, True
+    breaker = get_breaker(ai_model)
+    if breaker.is_open:
+        breaker.rejected += 1
+        raise CircuitOpenError(f"{ai_model} circuit open: {breaker.last_error}")
+    async with provider_slot(ai_model, priority):
+        # Checked again since the circuit may have opened while this call was queued
+        if not breaker.allow():
+            raise CircuitOpenError(f"{ai_model} circuit open: {breaker.last_error}")
+        started = time.monotonic()
+        try:
+            response = await AI_MODEL_MAP[ai_model](prompt, image, max_tokens)
+        except asyncio.CancelledError:
+            breaker.cancel()
+            raise
+        except Exception as e:
+            breaker.record(False, time.monotonic() - started, str(e))
+            raise
+        failed = bool(API_ERROR_PATTERN.match(response))
+        breaker.record(not failed, time.monotonic() - started, response if failed else None)
+    # Provider functions report failures as error strings, those must not be cached
+    if key and not API_ERROR_PATTERN.match(response):
+        response_cache.put(key, ai_model, response)
+    return response, False
+
+LIFE_HEADERS = ['emoji', 'common_name', 'scientific_name']
+
+def identify_life_prompt(tank_id: int) -> str:
+    header_str = ','.join(LIFE_HEADERS)
+    return f"""Return ONLY a CSV with fish, invertebrates, and plants that are CLEARLY VISIBLE in this underwater aquarium image.
 Limit responses to 4 most confident identifications.
 Use this EXACT format with these EXACT headers (no markdown, no extra text):
 {header_str}
 
 Example row:
 🐠,Neon Tetra,Paracheirodon innesi"""
-    
-    log.debug(f"Calling {ai_model} API for life identification")
-    response = await AI_MODEL_MAP[ai_model](prompt, image_path)
-    
-    # Clean response
+
+def estimate_temperature_prompt(tank_id: int) -> str:
+    return f"""Analyze the adhesive thermometer strip in this image of aquarium tank {tank_id}.
+Return ONLY the temperature values in this EXACT format (no extra text):
+temperature_f: <value>
+temperature_c: <value>
+
+Example response:
+temperature_f: 78.6
+temperature_c: 25.9"""
+
+def resolve_image_id(db: Any, image_id: Optional[str]) -> str:
+    """Check image_id exists, or return the latest image's id when none is given."""
+    if not image_id:
+        log.debug("No image_id provided, querying latest image")
+        image = db.query(DBImage).order_by(DBImage.timestamp.desc()).first()
+        if not image:
+            raise ValueError("No images found in database")
+        return image.id
+    log.debug(f"Using provided image_id: {image_id}")
+    image = db.query(DBImage).filter(DBImage.id == image_id).first()
+    if not image:
+        raise ValueError(f"Image {image_id} not found in database")
+    return image_id
+
+TEMPERATURE_F_PATTERNS = (re.compile(r'temperature_f:\s*(\d+\.?\d*)'), re.compile(r'(\d+\.?\d*)\s*[°℉F]'))
+TEMPERATURE_C_PATTERNS = (re.compile(r'temperature_c:\s*(\d+\.?\d*)'), re.compile(r'(\d+\.?\d*)\s*[°℃C]'))
+
+def clean_life_response(response: str) -> str:
     response = re.sub(r'```[^`]*```', '', response, flags=re.DOTALL)
     response = re.sub(r'^.*?(?=emoji,common_name,scientific_name|[^\x00-\x7F])', '', response, flags=re.DOTALL)
-    response = response.strip()
-    
+    return response.strip()
+
+def parse_temperature(response: str, patterns: Tuple[re.Pattern, ...]) -> Optional[float]:
+    """First temperature matched, trying the requested `temperature_x: value` format before bare units."""
+    for pattern in patterns:
+        match = pattern.search(response)
+        if match:
+            return float(match.group(1))
+    return None
+
+def valid_identify_life(response: str) -> bool:
+    """True if the response has at least one CSV row besides the header."""
+    for line in clean_life_response(response).splitlines():
+        if len(line.split(',')) >= len(LIFE_HEADERS) and not all(h in line.lower() for h in LIFE_HEADERS):
+            return True
+    return False
+
+def valid_estimate_temperature(response: str) -> bool:
+    return parse_temperature(response, TEMPERATURE_F_PATTERNS) is not None or \
+        parse_temperature(response, TEMPERATURE_C_PATTERNS) is not None
+
+def record_identify_life(db: Any, ai_model: str, response: str, tank_id: int, image_id: str, cached: bool) -> str:
+    """Store a life identification response and mark the identified life as seen."""
+    response = clean_life_response(response)
+
+    log.debug("Creating AI analysis record")
+    analysis = DBAIAnalysis(
+        id=datetime.now(timezone.utc).isoformat(),
+        image_id=image_id,
+        tank_id=tank_id,
+        ai_model=ai_model,
+        analysis='identify_life',
+        response=response,
+        cached=cached,
+        timestamp=datetime.now(timezone.utc)
+    )
+    db.add(analysis)
+
+    log.debug("Parsing CSV response")
+    lines = [line.strip() for line in response.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("Empty response")
+
+    # Process headers and data
+    first_line = lines[0].lower()
+    if all(h in first_line for h in LIFE_HEADERS):
+        headers = lines[0].split(',')
+        data_lines = lines[1:]
+    else:
+        headers = LIFE_HEADERS
+        data_lines = lines
+
+    header_map = {h.strip().lower(): i for i, h in enumerate(headers)}
+
+    # Rows are resolved against the in-memory life index, then written in one update and one insert
+    seen_at = datetime.now(timezone.utc)
+    life_ids: List[str] = []
+    unresolved = 0
+    for line in data_lines:
+        row = [col.strip() for col in line.split(',')]
+        if len(row) >= len(headers):
+            try:
+                emoji = row[header_map['emoji']]
+                common_name = row[header_map['common_name']] if 'common_name' in header_map else ''
+                scientific_name = row[header_map['scientific_name']] if 'scientific_name' in header_map else ''
+            except (KeyError, IndexError) as e:
+                log.error(f"Error processing row {row}: {str(e)}")
+                continue
+            life_id = life_index.resolve(emoji, common_name, scientific_name)
+            if life_id is None:
+                # Counted as a miss by the index, unknown species are added through POST /life
+                unresolved += 1
+                log.info(f"No single life record matches row {row}")
+            elif life_id not in life_ids:
+                life_ids.append(life_id)
+
+    if life_ids:
+        db.query(DBLife).filter(DBLife.id.in_(life_ids)).update({DBLife.last_seen_at: seen_at}, synchronize_session=False)
+    record_sightings(db, life_ids, image_id, ai_model, seen_at)
+
+    log.info(f"Updated {len(life_ids)} life records from {ai_model} analysis, {unresolved} rows unresolved")
+    return response
+
+def record_estimate_temperature(db: Any, ai_model: str, response: str, tank_id: int, image_id: str, cached: bool) -> str:
+    """Store a temperature response and add a reading when temperatures can be parsed from it."""
+    analysis = DBAIAnalysis(
+        id=datetime.now(timezone.utc).isoformat(),
+        image_id=image_id,
+        tank_id=tank_id,
+        ai_model=ai_model,
+        analysis='estimate_temperature',
+        response=response,
+        cached=cached,
+        timestamp=datetime.now(timezone.utc)
+    )
+    db.add(analysis)
+
+    # Extract temperature values
+    temp_f = parse_temperature(response, TEMPERATURE_F_PATTERNS)
+    temp_c = parse_temperature(response, TEMPERATURE_C_PATTERNS)
+
+    if temp_f is not None or temp_c is not None:
+        reading = DBReading(
+            id=datetime.now(timezone.utc).isoformat(),
+            temperature_f=temp_f,
+            temperature_c=temp_c,
+            tank_id=tank_id,
+            image_id=image_id,
+            timestamp=datetime.now(timezone.utc)
+        )
+        db.add(reading)
+        log.info(f"Added temperature reading for tank {tank_id}: {temp_f}°F / {temp_c}°C from {ai_model}")
+
+    return response
+
+ANALYSIS_PROMPTS: Dict[str, Callable[[int], str]] = {
+    'identify_life': identify_life_prompt,
+    'estimate_temperature': estimate_temperature_prompt,
+}
+
+ANALYSIS_RECORDERS: Dict[str, Callable[..., str]] = {
+    'identify_life': record_identify_life,
+    'estimate_temperature': record_estimate_temperature,
+}
+
+ANALYSIS_VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    'identify_life': valid_identify_life,
+    'estimate_temperature': valid_estimate_temperature,
+}
+
+def record_analysis(analysis: str, ai_model: str, response: str, tank_id: int, image_id: Optional[str], cached: bool) -> str:
+    """Record one analysis response in its own transaction so a bad answer does not discard others."""
     try:
         with get_db_session() as db:
-            if not image_id:
-                log.debug("No image_id provided, querying latest image")
-                image = db.query(DBImage).order_by(DBImage.timestamp.desc()).first()
-                if not image:
-                    raise ValueError("No images found in database")
-                image_id = image.id
-            else:
-                log.debug(f"Using provided image_id: {image_id}")
-                image = db.query(DBImage).filter(DBImage.id == image_id).first()
-                if not image:
-                    raise ValueError(f"Image {image_id} not found in database")
-            
-            log.debug("Creating AI analysis record")
-            analysis = DBAIAnalysis(
-                id=datetime.now(timezone.utc).isoformat(),
-                image_id=image_id,
-                tank_id=tank_id,
-                ai_model=ai_model,
-                analysis='identify_life',
-                response=response,
-                timestamp=datetime.now(timezone.utc)
-            )
-            db.add(analysis)
-            
-            log.debug("Parsing CSV response")
-            lines = [line.strip() for line in response.splitlines() if line.strip()]
-            if not lines:
-                raise ValueError("Empty response")
-                
-            # Process headers and data
-            first_line = lines[0].lower()
-            if all(h in first_line for h in expected_headers):
-                headers = lines[0].split(',')
-                data_lines = lines[1:]
-            else:
-                headers = expected_headers
-                data_lines = lines
-                
-            header_map = {h.strip().lower(): i for i, h in enumerate(headers)}
-            
-            updates = 0
-            for line in data_lines:
-                row = [col.strip() for col in line.split(',')]
-                if len(row) >= len(headers):
-                    try:
-                        emoji = row[header_map['emoji']]
-                        log.debug(f"Processing life record with emoji: {emoji}")
-                        
-                        life = db.query(DBLife).filter(DBLife.emoji == emoji).first()
-                        if life:
-                            life.last_seen_at = datetime.now(timezone.utc)
-                            current_refs = json.loads(life.image_refs)
-                            if image_id not in current_refs:
-                                current_refs.append(image_id)
-                                life.image_refs = json.dumps(current_refs)
-                            updates += 1
-                    except (KeyError, IndexError) as e:
-                        log.error(f"Error processing row {row}: {str(e)}")
-                        continue
-            
-            log.info(f"Updated {updates} life records from {ai_model} analysis")
-            return response
-            
+            resolved_id = resolve_image_id(db, image_id)
+            return ANALYSIS_RECORDERS[analysis](db, ai_model, response, tank_id, resolved_id, cached)
+    except Exception as e:
+        log.error(f"Database error in {analysis}: {str(e)}", exc_info=True)
+        return f"Database error: {str(e)}"
+
+async def async_identify_life(ai_model: str, image_path: str, tank_id: int, image_id: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, str]:
+    log.debug(f"Starting life identification with {ai_model} model")
+    if not os.path.exists(image_path):
+        log.error(f"Image file not found at {image_path}")
+        return f"Error: Image file not found"
+
+    log.debug(f"Calling {ai_model} API for life identification")
+    response, cached = await call_model(ai_model, identify_life_prompt(tank_id), image_path, priority)
+
+    try:
+        with get_db_session() as db:
+            image_id = resolve_image_id(db, image_id)
+            return record_identify_life(db, ai_model, response, tank_id, image_id, cached)
+
     except Exception as e:
         log.error(f"Database error in identify_life: {str(e)}", exc_info=True)
         return f"Database error: {str(e)}"
 
-async def async_estimate_temperature(ai_model: str, image_path: str, tank_id: int, image_id: Optional[str] = None) -> Dict[str, str]:
+async def async_estimate_temperature(ai_model: str, image_path: str, tank_id: int, image_id: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, str]:
     """Estimate temperature from image and update database."""
-    prompt = f"""Analyze the adhesive thermometer strip in this image of aquarium tank {tank_id}.
-Return ONLY the temperature values in this EXACT format (no extra text):
-temperature_f: <value>
-temperature_c: <value>
-
-Example response:
-temperature_f: 78.6
-temperature_c: 25.9"""
+    response, cached = await call_model(ai_model, estimate_temperature_prompt(tank_id), image_path, priority)
 
-    response = await AI_MODEL_MAP[ai_model](prompt, image_path)
-    
     try:
         with get_db_session() as db:
-            if not image_id:
-                log.debug("No image_id provided, querying latest image")
-                image = db.query(DBImage).order_by(DBImage.timestamp.desc()).first()
-                if not image:
-                    raise ValueError("No images found in database")
-                image_id = image.id
-            else:
-                log.debug(f"Using provided image_id: {image_id}")
-                image = db.query(DBImage).filter(DBImage.id == image_id).first()
-                if not image:
-                    raise ValueError(f"Image {image_id} not found in database")
-            
-            analysis = DBAIAnalysis(
-                id=datetime.now(timezone.utc).isoformat(),
-                image_id=image_id,
-                tank_id=tank_id,
-                ai_model=ai_model,
-                analysis='estimate_temperature',
-                response=response,
-                timestamp=datetime.now(timezone.utc)
-            )
-            db.add(analysis)
-            
-            # Extract temperature values
-            temp_f_match = re.search(r'(\d+\.?\d*)\s*[°℉F]', response)
-            temp_c_match = re.search(r'(\d+\.?\d*)\s*[°℃C]', response)
-            
-            if temp_f_match or temp_c_match:
-                temp_f = float(temp_f_match.group(1)) if temp_f_match else None
-                temp_c = float(temp_c_match.group(1)) if temp_c_match else None
-                
-                reading = DBReading(
-                    id=datetime.now(timezone.utc).isoformat(),
-                    temperature_f=temp_f,
-                    temperature_c=temp_c,
-                    tank_id=tank_id,
-                    image_id=image_id,
-                    timestamp=datetime.now(timezone.utc)
-                )
-                db.add(reading)
-                log.info(f"Added temperature reading for tank {tank_id}: {temp_f}°F / {temp_c}°C from {ai_model}")
-            
-            return response
-            
+            image_id = resolve_image_id(db, image_id)
+            return record_estimate_temperature(db, ai_model, response, tank_id, image_id, cached)
+
     except Exception as e:
         log.error(f"Database update error in estimate_temperature: {str(e)}")
         return f"Database error: {str(e)}"
 
+def batched_prompt(analyses: List[str], tank_id: int) -> str:
+    """Compose the prompts of several analyses into one, each answered under its own section header."""
+    sections = "\n\n".join(f"### {analysis}\n{ANALYSIS_PROMPTS[analysis](tank_id)}" for analysis in analyses)
+    return f"""Perform each of the following analyses on this image of aquarium tank {tank_id}.
+Answer every analysis in order. Start each answer with its header line exactly as given (for example "### {analyses[0]}"), \
+followed only by the answer in the format its instructions ask for.
+
+{sections}"""
+
+def split_batched_response(response: str, analyses: List[str]) -> Dict[str, str]:
+    """Split a batched response into per-analysis answers, missing sections are left out."""
+    parts = re.split(r'^\s*#{1,4}\s*(' + '|'.join(re.escape(a) for a in analyses) + r')\s*:?\s*$', response, flags=re.MULTILINE)
+    sections = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        sections.setdefault(name, body.strip())
+    return sections
+
+async def async_batched_analyses(ai_model: str, analyses: List[str], image_path: str, tank_id: int, image_id: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, str]:
+    """Run several analyses with one call to ai_model and record each answer as its own analysis."""
+    log.debug(f"Starting batched {analyses} with {ai_model} model")
+    response, cached = await call_model(
+        ai_model, batched_prompt(analyses, tank_id), image_path, priority, max_tokens=AI_MAX_TOKENS * len(analyses)
+    )
+    if API_ERROR_PATTERN.match(response):
+        sections = {analysis: response for analysis in analyses}
+    else:
+        sections = split_batched_response(response, analyses)
+
+    results = {}
+    for analysis in analyses:
+        if analysis not in sections:
+            log.warning(f"{ai_model} response has no {analysis} section")
+            results[analysis] = f"Error: {ai_model} response has no {analysis} section"
+            continue
+        results[analysis] = record_analysis(analysis, ai_model, sections[analysis], tank_id, image_id, cached)
+    return results
+
+_background_tasks: Set[asyncio.Task] = set()
+
+async def _record_stragglers(pending: Set[asyncio.Task], analysis: str, tank_id: int, image_id: Optional[str]) -> None:
+    """Record the responses of models that lost a first-wins race as they arrive."""
+    for task in asyncio.as_completed(pending):
+        try:
+            ai_model, (response, cached) = await task
+        except Exception as e:
+            log.warning(f"Background {analysis} call failed: {str(e)}")
+            continue
+        record_analysis(analysis, ai_model, response, tank_id, image_id, cached)
+
+async def async_first_valid(ai_models: List[str], analysis: str, image_path: str, tank_id: int, image_id: Optional[str] = None,
+                            priority: int = PRIORITY_INTERACTIVE, keep_others: bool = AI_HEDGE_KEEP_OTHERS) -> Dict[str, str]:
+    """Race ai_models on one analysis and return as soon as one response parses validly.
+
+    Models start in the given order, AI_HEDGE_DELAY apart. Calls still running when a
+    valid response arrives are cancelled, or with keep_others left to finish and be
+    recorded in the background. Every response that arrived before the winner is recorded.
+    """
+    prompt = ANALYSIS_PROMPTS[analysis](tank_id)
+    validate = ANALYSIS_VALIDATORS[analysis]
+
+    async def attempt(position: int, ai_model: str) -> Tuple[str, Tuple[str, bool]]:
+        if position and AI_HEDGE_DELAY > 0:
+            await asyncio.sleep(position * AI_HEDGE_DELAY)
+        return ai_model, await call_model(ai_model, prompt, image_path, priority)
+
+    started = time.monotonic()
+    pending = {asyncio.create_task(attempt(i, ai_model)) for i, ai_model in enumerate(ai_models)}
+    responses: Dict[str, Tuple[str, bool]] = {}
+    winner = None
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception():
+                    log.warning(f"{analysis} call failed in race: {str(task.exception())}")
+                    continue
+                ai_model, (response, cached) = task.result()
+                responses[ai_model] = (response, cached)
+                if winner is None and not API_ERROR_PATTERN.match(response) and validate(response):
+                    winner = ai_model
+    finally:
+        if pending and not (winner and keep_others):
+            for task in pending:
+                task.cancel()
+
+    if winner:
+        log.info(f"{winner} won {analysis} race in {time.monotonic() - started:.1f}s, {len(pending)} calls still running")
+    else:
+        log.warning(f"No valid {analysis} response from {ai_models}")
+    if pending and winner and keep_others:
+        task = asyncio.create_task(_record_stragglers(pending, analysis, tank_id, image_id))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    results = {}
+    for ai_model in sorted(responses, key=lambda ai_model: ai_model != winner):
+        response, cached = responses[ai_model]
+        results[f"{ai_model}.{analysis}"] = record_analysis(analysis, ai_model, response, tank_id, image_id, cached)
+    return results
+
 AI_ANALYSES_MAP: Dict[str, callable] = {
     'identify_life': async_identify_life,
     'estimate_temperature': async_estimate_temperature,
 }
 
-async def async_inference(ai_models: List[str], analyses: List[str], image_path: str, tank_id: int = None, image_id: Optional[str] = None) -> Dict[str, str]:
+async def async_inference(ai_models: List[str], analyses: List[str], image_path: str, tank_id: int = None, image_id: Optional[str] = None,
+                          priority: int = PRIORITY_INTERACTIVE, first_wins: bool = False) -> Dict[str, str]:
+    """Run analyses on an image with each model, or with first_wins race the models and keep the first valid answer."""
     log.debug(f"Starting AI inference - models: {ai_models}, analyses: {analyses}")
     try:
         if not ENABLED_MODELS:
             log.error("No AI APIs enabled")
             raise ValueError("No AI apis enabled")
         
-        tasks = []
-        task_keys = []
+        for analysis in analyses:
+            if analysis not in AI_ANALYSES_MAP:
+                log.error(f"Requested analysis {analysis} not found in available analyses: {list(AI_ANALYSES_MAP.keys())}")
+                raise ValueError(f"Analysis {analysis} not found in AI_ANALYSES_MAP")
         for ai_model in ai_models:
             if ai_model not in ENABLED_MODELS:
                 log.error(f"Requested model {ai_model} not in enabled models: {ENABLED_MODELS}")
                 raise ValueError(f"Model {ai_model} not enabled")
+
+        if first_wins:
+            log.debug(f"Racing {ai_models} on {analyses}")
+            raced = await asyncio.gather(*[
+                async_first_valid(ai_models, analysis, image_path, tank_id, image_id, priority) for analysis in analyses
+            ], return_exceptions=True)
+            results = {}
+            for analysis, resp in zip(analyses, raced):
+                if isinstance(resp, Exception):
+                    results[f"race.{analysis}"] = str(resp)
+                else:
+                    results.update(resp)
+            return results
+
+        batched = AI_BATCH_ANALYSES and len(analyses) > 1
+        tasks = []
+        task_keys = []
+        for ai_model in ai_models:
+            if batched:
+                log.debug(f"Adding batched task: {ai_model}.{','.join(analyses)}")
+                tasks.append(async_batched_analyses(ai_model, analyses, image_path, tank_id, image_id, priority))
+                task_keys.append([f"{ai_model}.{analysis}" for analysis in analyses])
+                continue
             for analysis in analyses:
-                if analysis not in AI_ANALYSES_MAP:
-                    log.error(f"Requested analysis {analysis} not found in available analyses: {list(AI_ANALYSES_MAP.keys())}")
-                    raise ValueError(f"Analysis {analysis} not found in AI_ANALYSES_MAP")
                 log.debug(f"Adding task: {ai_model}.{analysis}")
-                tasks.append(AI_ANALYSES_MAP[analysis](ai_model, image_path, tank_id, image_id))
+                tasks.append(AI_ANALYSES_MAP[analysis](ai_model, image_path, tank_id, image_id, priority))
                 task_keys.append(f"{ai_model}.{analysis}")
         
         if not tasks:
@@ -374,10 +645,14 @@ async def async_inference(ai_models: List[str], analyses: List[str], image_path:
         log.debug(f"Executing {len(tasks)} inference tasks")
         responses = await asyncio.gather(*tasks, return_exceptions=True)
         
-        results = {
-            key: resp if not isinstance(resp, Exception) else str(resp)
-            for key, resp in zip(task_keys, responses)
-        }
+        results = {}
+        for key, resp in zip(task_keys, responses):
+            if isinstance(key, list):
+                # Batched task, keyed per analysis like the separate tasks
+                for analysis_key, analysis in zip(key, analyses):
+                    results[analysis_key] = str(resp) if isinstance(resp, Exception) else resp[analysis]
+            else:
+                results[key] = resp if not isinstance(resp, Exception) else str(resp)
         
         log.debug("Inference results:")
         for key, result in results.items():
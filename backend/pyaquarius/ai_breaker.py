@@ -0,0 +1,115 @@
+"""Per-provider circuit breakers for AI calls.
+
+Each provider's breaker tracks the outcome and latency of its recent calls.
+When too many of them failed or were slow, the circuit opens and calls to
+that provider are rejected immediately instead of waiting out timeouts and
+retries. After a cooldown the circuit goes half-open and lets one probe call
+through; its outcome closes the circuit again or reopens it.
+"""
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+AI_BREAKER_WINDOW = int(os.getenv('AI_BREAKER_WINDOW', '20'))  # Recent calls the error rate is computed over
+AI_BREAKER_MIN_CALLS = int(os.getenv('AI_BREAKER_MIN_CALLS', '5'))  # Calls in the window before the circuit can open
+AI_BREAKER_ERROR_RATE = float(os.getenv('AI_BREAKER_ERROR_RATE', '0.5'))  # Share of failed or slow calls that opens the circuit
+AI_BREAKER_SLOW_CALL = float(os.getenv('AI_BREAKER_SLOW_CALL', '20'))  # Seconds after which a successful call still counts as failed
+AI_BREAKER_OPEN_SECONDS = float(os.getenv('AI_BREAKER_OPEN_SECONDS', '60'))  # Cooldown before a probe call is let through
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.calls: Deque[Tuple[bool, float]] = deque(maxlen=AI_BREAKER_WINDOW)  # (ok, seconds)
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are rejected without probing."""
+        return self.state == OPEN and time.monotonic() - self.opened_at < AI_BREAKER_OPEN_SECONDS
+
+    def allow(self) -> bool:
+        """True if a call may go through now, in half-open state only a single probe is let through."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < AI_BREAKER_OPEN_SECONDS:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            log.info(f"{self.name} circuit half-open, probing")
+        if self.state == HALF_OPEN:
+            if self.probing:
+                self.rejected += 1
+                return False
+            self.probing = True
+        return True
+
+    def record(self, ok: bool, seconds: float, error: Optional[str] = None) -> None:
+        ok = ok and seconds < AI_BREAKER_SLOW_CALL
+        if not ok:
+            self.last_error = error or f"Slow call: {seconds:.1f}s"
+        if self.state == HALF_OPEN:
+            self.probing = False
+            if ok:
+                self.state = CLOSED
+                self.calls.clear()
+                log.info(f"{self.name} circuit closed after successful probe")
+            else:
+                self._open()
+            return
+        self.calls.append((ok, seconds))
+        if self.state == CLOSED and len(self.calls) >= AI_BREAKER_MIN_CALLS and self.error_rate >= AI_BREAKER_ERROR_RATE:
+            self._open()
+
+    def cancel(self) -> None:
+        """The allowed call was abandoned without an outcome."""
+        if self.state == HALF_OPEN:
+            self.probing = False
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        log.warning(f"{self.name} circuit open for {AI_BREAKER_OPEN_SECONDS:.0f}s: {self.last_error}")
+
+    @property
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for ok, _ in self.calls if not ok) / len(self.calls)
+
+    def status(self) -> Dict[str, Any]:
+        latencies = sorted(seconds for _, seconds in self.calls)
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate, 3),
+            "calls": len(self.calls),
+            "p50_seconds": round(latencies[len(latencies) // 2], 2) if latencies else None,
+            "rejected": self.rejected,
+            "retry_in_seconds": round(max(0.0, AI_BREAKER_OPEN_SECONDS - (time.monotonic() - self.opened_at)), 1)
+            if self.state == OPEN else None,
+            "last_error": self.last_error,
+        }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(ai_model: str) -> CircuitBreaker:
+    breaker = _breakers.get(ai_model)
+    if breaker is None:
+        breaker = _breakers[ai_model] = CircuitBreaker(ai_model)
+    return breaker
+
+def status() -> Dict[str, Dict[str, Any]]:
+    return {ai_model: breaker.status() for ai_model, breaker in _breakers.items()}
@@ -0,0 +1,118 @@
+"""Content-addressed cache of AI provider responses.
+
+Responses are keyed by the model, a hash of the prompt and a hash of the
+uploaded image bytes, so re-analyzing the same image with the same prompt and
+model is served without calling the provider. Entries are stored in SQLite so they survive
+restarts, with an in-memory LRU in front for repeated lookups.
+"""
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from pyaquarius.models import DBAICacheEntry, get_db_session
+
+log = logging.getLogger(__name__)
+
+AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true'
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', '604800'))  # Seconds a cached response stays valid
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '10000'))  # Least recently used entries beyond this are evicted
+AI_CACHE_MEMORY_ENTRIES = int(os.getenv('AI_CACHE_MEMORY_ENTRIES', '256'))
+
+class AIResponseCache:
+    def __init__(self, ttl: int = AI_CACHE_TTL, max_entries: int = AI_CACHE_MAX_ENTRIES,
+                 memory_entries: int = AI_CACHE_MEMORY_ENTRIES):
+        self.ttl = timedelta(seconds=ttl)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: OrderedDict[str, Tuple[str, datetime]] = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(model: str, prompt: str, image_hash: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"{model}\n{prompt_hash}\n{image_hash}".encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, response: str, created_at: datetime) -> None:
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for key, or None on a miss or an expired entry."""
+        now = datetime.utcnow()
+        entry = self._memory.get(key)
+        if entry is not None:
+            response, created_at = entry
+            if now - created_at <= self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return response
+            del self._memory[key]
+        try:
+            with get_db_session() as db:
+                row = db.query(DBAICacheEntry).filter(DBAICacheEntry.key == key).first()
+                if row is not None and now - row.created_at <= self.ttl:
+                    row.last_used_at = now
+                    self._remember(key, row.response, row.created_at)
+                    self.db_hits += 1
+                    return row.response
+                if row is not None:
+                    db.delete(row)
+        except Exception as e:
+            log.error(f"AI cache lookup failed: {str(e)}")
+        self.misses += 1
+        return None
+
+    def put(self, key: str, ai_model: str, response: str) -> None:
+        now = datetime.utcnow()
+        self._remember(key, response, now)
+        try:
+            with get_db_session() as db:
+                db.merge(DBAICacheEntry(key=key, ai_model=ai_model, response=response, created_at=now, last_used_at=now))
+                self.stores += 1
+                if self.stores % 100 == 1:
+                    self._prune(db, now)
+        except Exception as e:
+            log.error(f"AI cache store failed: {str(e)}")
+
+    def _prune(self, db: Any, now: datetime) -> None:
+        """Drop expired entries and the least recently used ones beyond max_entries."""
+        evicted = db.query(DBAICacheEntry)\
+            .filter(DBAICacheEntry.created_at < now - self.ttl)\
+            .delete(synchronize_session=False)
+        stale = select(DBAICacheEntry.key)\
+            .order_by(DBAICacheEntry.last_used_at.desc())\
+            .offset(self.max_entries)
+        evicted += db.query(DBAICacheEntry)\
+            .filter(DBAICacheEntry.key.in_(stale))\
+            .delete(synchronize_session=False)
+        if evicted:
+            self.evictions += evicted
+            log.info(f"Evicted {evicted} AI cache entries")
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": AI_CACHE_ENABLED,
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+        }
+
+response_cache = AIResponseCache()
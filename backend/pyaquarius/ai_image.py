@@ -0,0 +1,165 @@
+"""Prepare captures for upload to the AI providers.
+
+Each image is cropped to the configured region of interest, downscaled to the
+provider's max dimension and re-encoded once. Results are keyed on the output
+size read from the file header, so providers whose max dimension gives the
+same output share one result, including its base64 encoding.
+"""
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import struct
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+AI_IMAGE_MAX_DIM = int(os.getenv('AI_IMAGE_MAX_DIM', '1568'))  # Default for providers not in AI_IMAGE_MAX_DIMS
+AI_IMAGE_MAX_DIMS = os.getenv('AI_IMAGE_MAX_DIMS', 'claude:1568,gpt:2048,gemini:3072')
+AI_IMAGE_QUALITY = int(os.getenv('AI_IMAGE_QUALITY', '85'))
+AI_IMAGE_ROI = os.getenv('AI_IMAGE_ROI', '')  # x,y,width,height as fractions of the image, empty for the full frame
+AI_IMAGE_CACHE_SIZE = int(os.getenv('AI_IMAGE_CACHE_SIZE', '16'))
+
+def parse_max_dims(spec: str) -> Dict[str, int]:
+    """Parse `model:max_dim` pairs."""
+    max_dims = {}
+    for entry in spec.split(','):
+        if entry.strip():
+            model, _, max_dim = entry.strip().partition(':')
+            max_dims[model] = int(max_dim)
+    return max_dims
+
+def parse_roi(spec: str) -> Optional[Tuple[float, float, float, float]]:
+    if not spec.strip():
+        return None
+    x, y, w, h = (float(v) for v in spec.split(','))
+    if not (0 <= x < 1 and 0 <= y < 1 and 0 < w <= 1 - x and 0 < h <= 1 - y):
+        raise ValueError(f"Invalid AI_IMAGE_ROI {spec}, expected x,y,width,height fractions within the image")
+    return x, y, w, h
+
+MAX_DIMS = parse_max_dims(AI_IMAGE_MAX_DIMS)
+ROI = parse_roi(AI_IMAGE_ROI)
+
+class PreparedImage:
+    """JPEG bytes ready for upload, base64 is encoded on first use and shared."""
+    __slots__ = ('source_path', 'data', 'width', 'height', 'digest', '_base64')
+
+    def __init__(self, source_path: str, data: bytes, width: int, height: int):
+        self.source_path = source_path
+        self.data = data
+        self.width = width
+        self.height = height
+        self.digest = hashlib.sha256(data).hexdigest()
+        self._base64: Optional[str] = None
+
+    @property
+    def base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode('utf-8')
+        return self._base64
+
+def source_size(image_path: str) -> Optional[Tuple[int, int]]:
+    """Width and height from a JPEG or PNG header without decoding the image, None for other files."""
+    with open(image_path, 'rb') as f:
+        head = f.read(24)
+        if head[:8] == b'\x89PNG\r\n\x1a\n':
+            return struct.unpack('>II', head[16:24])
+        if head[:2] != b'\xff\xd8':
+            return None
+        f.seek(2)
+        while True:
+            byte = f.read(1)
+            while byte == b'\xff':
+                byte = f.read(1)
+            if not byte:
+                return None
+            marker = byte[0]
+            if marker == 0x01 or 0xd0 <= marker <= 0xd7:
+                continue
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            # Start of frame markers, except DHT, JPG and DAC which share the range
+            if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                height, width = struct.unpack('>xHH', f.read(5))
+                return width, height
+            f.seek(struct.unpack('>H', length)[0] - 2, os.SEEK_CUR)
+
+def output_size(size: Tuple[int, int], max_dim: int, roi: Optional[Tuple[float, float, float, float]]) -> Tuple[int, int]:
+    """Size _prepare produces for a source of the given size."""
+    width, height = size
+    if roi:
+        x, y, w, h = roi
+        height = int((y + h) * height) - int(y * height)
+        width = int((x + w) * width) - int(x * width)
+    if max(width, height) > max_dim:
+        scale = max_dim / max(width, height)
+        width, height = int(width * scale), int(height * scale)
+    return width, height
+
+_prepared: OrderedDict = OrderedDict()
+_stats = {"prepared": 0, "reused": 0, "source_bytes": 0, "upload_bytes": 0}
+
+def _prepare(image_path: str, max_dim: int, quality: int, roi: Optional[Tuple[float, float, float, float]]) -> PreparedImage:
+    with open(image_path, 'rb') as f:
+        source = f.read()
+    image = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Failed to decode image: {image_path}")
+    height, width = image.shape[:2]
+    transformed = False
+    if roi:
+        x, y, w, h = roi
+        image = image[int(y * height):int((y + h) * height), int(x * width):int((x + w) * width)]
+        height, width = image.shape[:2]
+        transformed = True
+    if max(width, height) > max_dim:
+        scale = max_dim / max(width, height)
+        width, height = int(width * scale), int(height * scale)
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        transformed = True
+    ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ret:
+        raise ValueError(f"Failed to encode image: {image_path}")
+    data = buffer.tobytes()
+    if not transformed and len(source) <= len(data) and source[:2] == b'\xff\xd8':
+        data = source  # Re-encoding a small JPEG only loses quality
+    _stats["prepared"] += 1
+    _stats["source_bytes"] += len(source)
+    _stats["upload_bytes"] += len(data)
+    log.debug(f"Prepared {image_path} for upload: {len(source)} -> {len(data)} bytes at {width}x{height}")
+    return PreparedImage(image_path, data, width, height)
+
+async def prepare_image(image_path: str, ai_model: str) -> PreparedImage:
+    """Prepared upload for image_path with the settings of ai_model, computed once per image and settings."""
+    if not os.path.exists(image_path):
+        raise ValueError(f"Image file not found: {image_path}")
+    max_dim = MAX_DIMS.get(ai_model, AI_IMAGE_MAX_DIM)
+    size = source_size(image_path)
+    # Providers whose max dimension exceeds the image share one prepared upload
+    output = output_size(size, max_dim, ROI) if size else max_dim
+    key = (image_path, os.stat(image_path).st_mtime_ns, output, AI_IMAGE_QUALITY, ROI)
+    task = _prepared.get(key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(_prepare, image_path, max_dim, AI_IMAGE_QUALITY, ROI))
+        _prepared[key] = task
+        while len(_prepared) > AI_IMAGE_CACHE_SIZE:
+            _prepared.popitem(last=False)
+    else:
+        _prepared.move_to_end(key)
+        _stats["reused"] += 1
+    try:
+        # Shielded so one cancelled caller does not cancel the work the others share
+        return await asyncio.shield(task)
+    except Exception:
+        _prepared.pop(key, None)
+        raise
+
+def stats() -> Dict[str, Any]:
+    saved = _stats["source_bytes"] - _stats["upload_bytes"]
+    return {**_stats, "saved_bytes": saved}
@@ -0,0 +1,74 @@
+"""Local stand-in for the AI providers, for benchmarks and development without API keys.
+
+Enabled with AI_MOCK_ENABLED, it registers as the `mock` model and answers in
+process after a log-normal latency, failing at the configured error and
+timeout rates. Answers follow the format each prompt asks for, using species
+from ainotes/life.csv, so response parsing and DB writes run as they do with
+real providers.
+"""
+import csv
+import logging
+import os
+import random
+import re
+from typing import List, Optional
+
+from pyaquarius.models import LIFE_CSV_PATH
+
+log = logging.getLogger(__name__)
+
+AI_MOCK_ENABLED = os.getenv('AI_MOCK_ENABLED', 'false').lower() == 'true'
+AI_MOCK_LATENCY_MS = float(os.getenv('AI_MOCK_LATENCY_MS', '800'))  # Median latency
+AI_MOCK_LATENCY_SIGMA = float(os.getenv('AI_MOCK_LATENCY_SIGMA', '0.5'))  # Log-normal spread, 0 for a fixed latency
+AI_MOCK_ERROR_RATE = float(os.getenv('AI_MOCK_ERROR_RATE', '0'))  # Share of calls answered with an API error
+AI_MOCK_TIMEOUT_RATE = float(os.getenv('AI_MOCK_TIMEOUT_RATE', '0'))  # Share of calls that hang past AI_API_TIMEOUT
+AI_MOCK_SEED = os.getenv('AI_MOCK_SEED', '')
+
+_random = random.Random(int(AI_MOCK_SEED) if AI_MOCK_SEED else None)
+_life_rows: Optional[List[List[str]]] = None
+
+def latency() -> float:
+    """Seconds the next call takes."""
+    if AI_MOCK_LATENCY_SIGMA <= 0:
+        return AI_MOCK_LATENCY_MS / 1000
+    return _random.lognormvariate(0, AI_MOCK_LATENCY_SIGMA) * AI_MOCK_LATENCY_MS / 1000
+
+def outcome() -> str:
+    """'ok', 'error' or 'timeout' for the next call."""
+    roll = _random.random()
+    if roll < AI_MOCK_ERROR_RATE:
+        return 'error'
+    if roll < AI_MOCK_ERROR_RATE + AI_MOCK_TIMEOUT_RATE:
+        return 'timeout'
+    return 'ok'
+
+def _life() -> List[List[str]]:
+    global _life_rows
+    if _life_rows is None:
+        with open(LIFE_CSV_PATH, mode='r') as csvfile:
+            _life_rows = [[row['emoji'], row['common_name'], row['scientific_name']] for row in csv.DictReader(csvfile)]
+    return _life_rows
+
+def identify_life_answer() -> str:
+    rows = _random.sample(_life(), k=min(len(_life()), _random.randint(1, 4)))
+    return "emoji,common_name,scientific_name\n" + "\n".join(','.join(row) for row in rows)
+
+def estimate_temperature_answer() -> str:
+    temp_f = round(_random.uniform(75.0, 81.0), 1)
+    return f"temperature_f: {temp_f}\ntemperature_c: {round((temp_f - 32) * 5 / 9, 1)}"
+
+ANSWERS = {
+    'identify_life': identify_life_answer,
+    'estimate_temperature': estimate_temperature_answer,
+}
+
+def answer(prompt: str) -> str:
+    """Answer in the format the prompt asks for, one section per analysis for batched prompts."""
+    sections = re.findall(r'^### (\w+)$', prompt, flags=re.MULTILINE)
+    if sections:
+        return "\n\n".join(f"### {section}\n{ANSWERS[section]()}" for section in sections if section in ANSWERS)
+    if 'emoji,common_name,scientific_name' in prompt:
+        return identify_life_answer()
+    if 'temperature_f' in prompt:
+        return estimate_temperature_answer()
+    return "OK"
@@ -0,0 +1,151 @@
+"""Admission control for AI provider calls.
+
+Every provider call waits for a slot from that provider's gate. A gate caps the
+calls in flight and refills a token bucket at the provider's rate limit, so
+overlapping scans and manual analyses queue locally instead of tripping the
+provider's limits and the retry backoff. Waiters are served by priority, then
+in arrival order, so interactive requests overtake scheduled and backfill work.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pyaquarius.metrics import RollingStats
+
+log = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SCHEDULED = 1
+PRIORITY_BACKFILL = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_SCHEDULED: 'scheduled', PRIORITY_BACKFILL: 'backfill'}
+
+AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', '2'))  # Default for providers not in AI_CONCURRENCY
+AI_CONCURRENCY = os.getenv('AI_CONCURRENCY', 'claude:2,gpt:4,gemini:2')
+AI_RATE_LIMIT = float(os.getenv('AI_RATE_LIMIT', '30'))  # Requests per minute for providers not in AI_RATE_LIMITS, 0 for no limit
+AI_RATE_LIMITS = os.getenv('AI_RATE_LIMITS', 'claude:50,gpt:60,gemini:15')
+AI_WAIT_BUCKETS_MS = (10, 100, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+def parse_limits(spec: str) -> Dict[str, float]:
+    """Parse `model:value` pairs."""
+    limits = {}
+    for entry in spec.split(','):
+        if entry.strip():
+            model, _, value = entry.strip().partition(':')
+            limits[model] = float(value)
+    return limits
+
+CONCURRENCY = parse_limits(AI_CONCURRENCY)
+RATE_LIMITS = parse_limits(AI_RATE_LIMITS)
+
+class ProviderGate:
+    """Concurrency cap plus token bucket for one provider, with a priority queue of waiters."""
+
+    def __init__(self, name: str, concurrency: int, rate_per_minute: float):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.rate = rate_per_minute / 60
+        self.capacity = float(self.concurrency)  # Largest burst the bucket allows
+        self.tokens = self.capacity
+        self.active = 0
+        self.completed = 0
+        self.wait_stats: Dict[str, RollingStats] = defaultdict(lambda: RollingStats(buckets_ms=AI_WAIT_BUCKETS_MS))
+        self._refilled_at = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self._refilled_at) * self.rate)
+        else:
+            self.tokens = self.capacity
+        self._refilled_at = now
+
+    def _dispatch(self) -> None:
+        """Grant slots to the highest priority waiters while both a slot and a token are free."""
+        self._refill()
+        while self._waiters and self.active < self.concurrency and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():  # Waiter was cancelled
+                continue
+            self.tokens -= 1
+            self.active += 1
+            future.set_result(None)
+        if self._waiters and self.active < self.concurrency and self._wakeup is None:
+            # Only the rate limit is holding waiters back, wake up when the next token is due
+            delay = (1 - self.tokens) / self.rate
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    async def acquire(self, priority: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # Granted just as the caller was cancelled
+            raise
+        waited = time.monotonic() - started
+        self.wait_stats[PRIORITY_NAMES.get(priority, str(priority))].record(waited)
+        if waited > 1:
+            log.debug(f"{self.name} call waited {waited:.1f}s for a slot")
+
+    def release(self) -> None:
+        self.active -= 1
+        self.completed += 1
+        self._dispatch()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def metrics(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "concurrency": self.concurrency,
+            "rate_per_minute": self.rate * 60,
+            "active": self.active,
+            "queued": self.queued,
+            "tokens": round(self.tokens, 2),
+            "completed": self.completed,
+            "wait": {priority: stats.summary() for priority, stats in self.wait_stats.items()},
+        }
+
+_gates: Dict[str, ProviderGate] = {}
+
+def get_gate(ai_model: str) -> ProviderGate:
+    gate = _gates.get(ai_model)
+    if gate is None:
+        gate = ProviderGate(
+            ai_model,
+            int(CONCURRENCY.get(ai_model, AI_MAX_CONCURRENCY)),
+            RATE_LIMITS.get(ai_model, AI_RATE_LIMIT),
+        )
+        _gates[ai_model] = gate
+    return gate
+
+@asynccontextmanager
+async def provider_slot(ai_model: str, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[None]:
+    """Hold one of ai_model's call slots for the duration of the block."""
+    gate = get_gate(ai_model)
+    await gate.acquire(priority)
+    try:
+        yield
+    finally:
+        gate.release()
+
+def metrics() -> Dict[str, Any]:
+    return {ai_model: gate.metrics() for ai_model, gate in _gates.items()}
@@ -0,0 +1,164 @@
+"""Reuse of images uploaded through the Gemini File API.
+
+Uploads are recorded by the sha256 of the uploaded bytes, so analyzing the
+same prepared image again, or running several analyses on it, references
+the file already on Gemini's side instead of uploading it again. Records live
+in the gemini_uploads table with an in-memory copy in front. A background loop
+deletes expired uploads remotely, well before Gemini's own 48 hour expiry.
+"""
+import asyncio
+import io
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from pyaquarius.ai_image import PreparedImage
+from pyaquarius.models import DBGeminiUpload, get_db_session, get_read_session
+
+log = logging.getLogger(__name__)
+
+AI_GEMINI_UPLOAD_TTL = min(int(os.getenv('AI_GEMINI_UPLOAD_TTL', '86400')), 47 * 3600)  # Seconds an upload is reused, Gemini keeps files 48h
+AI_GEMINI_CLEANUP_INTERVAL = int(os.getenv('AI_GEMINI_CLEANUP_INTERVAL', '600'))
+GEMINI_FILE_RETENTION = timedelta(hours=48)
+
+def is_missing_file_error(e: Exception) -> bool:
+    """True if Gemini says the referenced file no longer exists or is not ours."""
+    try:
+        from google.api_core.exceptions import NotFound, PermissionDenied
+    except ImportError:
+        return False
+    return isinstance(e, (NotFound, PermissionDenied))
+
+class GeminiUploads:
+    def __init__(self, ttl: int = AI_GEMINI_UPLOAD_TTL):
+        self.ttl = timedelta(seconds=ttl)
+        self._memory: Dict[str, Tuple[str, str, datetime]] = {}  # digest -> (uri, mime_type, expires_at)
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self.uploads = 0
+        self.reused = 0
+        self.deleted = 0
+
+    async def file_part(self, image: PreparedImage) -> Dict[str, Any]:
+        """Content part referencing image on Gemini, uploading it only if no live upload exists."""
+        entry = self._lookup(image.digest)
+        if entry is None:
+            task = self._pending.get(image.digest)
+            if task is None:
+                task = asyncio.ensure_future(asyncio.to_thread(self._upload, image))
+                self._pending[image.digest] = task
+                task.add_done_callback(lambda _: self._pending.pop(image.digest, None))
+            # Shielded so concurrent calls for the same image share one upload
+            entry = await asyncio.shield(task)
+        else:
+            self.reused += 1
+        uri, mime_type, _ = entry
+        return {"file_data": {"file_uri": uri, "mime_type": mime_type}}
+
+    def forget(self, digest: str) -> None:
+        """Stop reusing an upload Gemini no longer serves, the cleanup loop deletes its remote file."""
+        self._memory.pop(digest, None)
+        try:
+            with get_db_session() as db:
+                db.query(DBGeminiUpload)\
+                    .filter(DBGeminiUpload.digest == digest)\
+                    .update({DBGeminiUpload.expires_at: datetime.utcnow()}, synchronize_session=False)
+        except Exception as e:
+            log.error(f"Failed to forget Gemini upload {digest}: {str(e)}")
+
+    def _lookup(self, digest: str) -> Optional[Tuple[str, str, datetime]]:
+        now = datetime.utcnow()
+        entry = self._memory.get(digest)
+        if entry is None:
+            with get_read_session() as db:
+                row = db.query(DBGeminiUpload).filter(DBGeminiUpload.digest == digest).first()
+                if row is not None:
+                    entry = (row.uri, row.mime_type, row.expires_at)
+                    self._memory[digest] = entry
+        if entry is not None and entry[2] > now:
+            return entry
+        return None
+
+    def _upload(self, image: PreparedImage) -> Tuple[str, str, datetime]:
+        import google.generativeai as genai
+        uploaded_file = genai.upload_file(io.BytesIO(image.data), mime_type='image/jpeg', display_name=f"aquarius-{image.digest[:16]}")
+        log.info(f"Uploaded file to Gemini: {uploaded_file.uri}")
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        with get_read_session() as db:
+            previous = db.query(DBGeminiUpload.name).filter(DBGeminiUpload.digest == image.digest).scalar()
+        # The record is replaced below, so its expired file is deleted now rather than left to the cleanup loop
+        if previous and previous != uploaded_file.name:
+            self._delete_remote(previous)
+        with get_db_session() as db:
+            db.merge(DBGeminiUpload(
+                digest=image.digest,
+                name=uploaded_file.name,
+                uri=uploaded_file.uri,
+                mime_type='image/jpeg',
+                created_at=now,
+                expires_at=expires_at,
+            ))
+        self.uploads += 1
+        entry = (uploaded_file.uri, 'image/jpeg', expires_at)
+        self._memory[image.digest] = entry
+        return entry
+
+    def _delete_remote(self, name: str) -> bool:
+        """Delete a file on Gemini, True once it is gone."""
+        import google.generativeai as genai
+        try:
+            genai.delete_file(name)
+            self.deleted += 1
+            return True
+        except Exception as e:
+            if is_missing_file_error(e):
+                return True
+            log.warning(f"Could not delete Gemini file {name}: {str(e)}")
+            return False
+
+    def cleanup(self) -> None:
+        """Delete expired uploads remotely, keeping records whose delete failed for the next run."""
+        now = datetime.utcnow()
+        with get_read_session() as db:
+            expired = [(row.digest, row.name, row.created_at)
+                       for row in db.query(DBGeminiUpload).filter(DBGeminiUpload.expires_at <= now)]
+        # Remote deletes happen outside the write transaction so they do not hold up other writes
+        removed = []
+        for digest, name, created_at in expired:
+            self._memory.pop(digest, None)
+            # Gemini drops files itself after 48h, so records that old are removed regardless
+            if self._delete_remote(name) or now - created_at > GEMINI_FILE_RETENTION:
+                removed.append(digest)
+        if removed:
+            with get_db_session() as db:
+                db.query(DBGeminiUpload)\
+                    .filter(DBGeminiUpload.digest.in_(removed), DBGeminiUpload.expires_at <= now)\
+                    .delete(synchronize_session=False)
+            log.info(f"Removed {len(removed)} expired Gemini uploads")
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.cleanup)
+            except Exception as e:
+                log.error(f"Gemini upload cleanup failed: {str(e)}")
+            await asyncio.sleep(AI_GEMINI_CLEANUP_INTERVAL)
+
+    def start(self) -> None:
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def stop(self) -> None:
+        if self._cleanup_task:
+            self._cleanup_task.cancel()
+            await asyncio.gather(self._cleanup_task, return_exceptions=True)
+            self._cleanup_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        live = sum(1 for _, _, expires_at in self._memory.values() if expires_at > now)
+        return {"uploads": self.uploads, "reused": self.reused, "deleted": self.deleted, "live": live}
+
+gemini_uploads = GeminiUploads()
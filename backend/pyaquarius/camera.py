@@ -1,12 +1,21 @@
 from __future__ import annotations
 import asyncio
-from typing import Optional, List, Dict, AsyncGenerator
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, List, Dict, NamedTuple, Set, AsyncGenerator
 import logging
 import cv2
+import heapq
+import numpy as np
 import os
-from datetime import datetime
+import shutil
+import threading
 import time
 
+from .metrics import RollingStats
+from .models import DBImage, get_db_session
+from .sources import is_source_spec, open_source
+
 log = logging.getLogger(__name__)
 
 CAMERA_FPS = int(os.getenv('CAMERA_FPS', '15'))
@@ -15,8 +24,142 @@ CAMERA_MAX_DIM = int(os.getenv('CAMERA_MAX_DIM', '1024'))
 CAMERA_WIDTH = int(os.getenv('CAMERA_WIDTH', '1280'))
 CAMERA_HEIGHT = int(os.getenv('CAMERA_HEIGHT', '720'))
 CAMERA_MAX_IMAGES = int(os.getenv('CAMERA_MAX_IMAGES', '1000'))
+CAMERA_MIN_FREE_SPACE_MB = int(os.getenv('CAMERA_MIN_FREE_SPACE_MB', '500'))
+CAMERA_MAX_SPACE_EVICTIONS = int(os.getenv('CAMERA_MAX_SPACE_EVICTIONS', '10'))  # Images evicted per capture when disk space is low
 IMAGES_DIR = os.getenv('IMAGES_DIR', 'data/images')
-CAMERA_STREAM_TOGGLE_DELAY = float(os.getenv('CAMERA_STREAM_TOGGLE_DELAY', '50')) / 1000  # Convert ms to seconds
+CAMERA_SUBSCRIBER_QUEUE_SIZE = int(os.getenv('CAMERA_SUBSCRIBER_QUEUE_SIZE', '2'))
+CAMERA_IO_THREADS = int(os.getenv('CAMERA_IO_THREADS', '2'))  # Worker threads per device for reads, codecs and disk writes
+CAMERA_RING_SIZE = int(os.getenv('CAMERA_RING_SIZE', '8'))  # Recent raw frames kept per device for capture
+CAMERA_RING_WARM_TIME = float(os.getenv('CAMERA_RING_WARM_TIME', '30'))  # Seconds to keep grabbing after a capture with no viewers
+CAMERA_CAPTURE_TIMEOUT = float(os.getenv('CAMERA_CAPTURE_TIMEOUT', '3'))  # Seconds to wait for a fresh frame on capture
+CAMERA_PROBE_TIMEOUT = float(os.getenv('CAMERA_PROBE_TIMEOUT', '10'))  # Seconds to wait for a device to open at startup
+CAMERA_SOURCES = os.getenv('CAMERA_SOURCES', '')  # Software sources as index=spec, see sources.py
+CAMERA_MJPEG_PASSTHROUGH = os.getenv('CAMERA_MJPEG_PASSTHROUGH', 'false').lower() == 'true'  # Forward the camera's own MJPEG frames
+_DEFAULT_STREAM_PROFILES = f'high:{CAMERA_MAX_DIM}:{CAMERA_FPS}:90,medium:640:15:75,low:320:5:50'
+if CAMERA_MJPEG_PASSTHROUGH:
+    # Full resolution profile that is forwarded as-is without decoding or re-encoding
+    _DEFAULT_STREAM_PROFILES = f'native:{max(CAMERA_WIDTH, CAMERA_HEIGHT)}:{CAMERA_FPS}:95,' + _DEFAULT_STREAM_PROFILES
+CAMERA_STREAM_PROFILES = os.getenv('CAMERA_STREAM_PROFILES') or _DEFAULT_STREAM_PROFILES  # name:max_dim:fps:quality, empty for the defaults
+CAMERA_BURST_WINDOW = float(os.getenv('CAMERA_BURST_WINDOW', '500')) / 1000  # Max burst duration, ms to seconds
+CAMERA_SHARPNESS_DIM = 320  # Frames are downscaled to this before scoring sharpness
+CAMERA_FINGERPRINT_SIZE = 16  # Difference hash grid, fingerprints are CAMERA_FINGERPRINT_SIZE**2 bits
+CAMERA_METRICS_WINDOW = int(os.getenv('CAMERA_METRICS_WINDOW', '300'))  # Samples kept per pipeline stage for metrics
+CAMERA_METRICS_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CAMERA_SYNC_WINDOW = float(os.getenv('CAMERA_SYNC_WINDOW', '50')) / 1000  # Max spread between frames of a multi-camera capture, ms to seconds
+CAMERA_DOWNGRADE_DROPS = int(os.getenv('CAMERA_DOWNGRADE_DROPS', '10'))  # Consecutive dropped frames before a client moves down a profile
+
+class Frame:
+    """A frame read from a device, stamped with the wall-clock time the read completed.
+
+    Holds either decoded BGR pixels or, in MJPEG passthrough mode, the camera's
+    compressed JPEG buffer which is only decoded when pixels are needed.
+    """
+    __slots__ = ('timestamp', 'jpeg', 'width', 'height', '_image')
+
+    def __init__(self, timestamp: float, image=None, jpeg=None, width: int = 0, height: int = 0):
+        self.timestamp = timestamp
+        self.jpeg = jpeg
+        self._image = image
+        if image is not None:
+            height, width = image.shape[:2]
+        self.width = width
+        self.height = height
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._image is not None
+
+    def decode(self):
+        """Return BGR pixels, decoding the JPEG buffer on first use. Blocking."""
+        if self._image is None:
+            self._image = cv2.imdecode(self.jpeg, cv2.IMREAD_COLOR)
+            if self._image is None:
+                raise ValueError("Failed to decode MJPEG frame")
+            self.height, self.width = self._image.shape[:2]
+        return self._image
+
+class CaptureResult(NamedTuple):
+    filepath: str
+    width: int
+    height: int
+    file_size: int
+    sharpness: float
+    fingerprint: str
+
+def sharpness(image) -> float:
+    """Variance of the Laplacian on a downscaled grayscale copy, higher is sharper. Blocking."""
+    height, width = image.shape[:2]
+    scale = CAMERA_SHARPNESS_DIM / max(width, height)
+    if scale < 1:
+        image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+def fingerprint(image) -> str:
+    """Difference hash of the frame as a hex string, robust to noise and small exposure changes. Blocking."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (CAMERA_FINGERPRINT_SIZE + 1, CAMERA_FINGERPRINT_SIZE), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1]).tobytes().hex()
+
+def fingerprint_distance(a: str, b: str) -> int:
+    """Number of differing bits between two fingerprints."""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+class StreamProfile:
+    """Encoding settings shared by every stream client that selects them."""
+    __slots__ = ('name', 'max_dim', 'fps', 'quality')
+
+    def __init__(self, name: str, max_dim: int, fps: int, quality: int):
+        self.name = name
+        self.max_dim = max_dim
+        self.fps = fps
+        self.quality = quality
+
+    def __repr__(self) -> str:
+        return f"StreamProfile({self.name}: {self.max_dim}px {self.fps}fps q{self.quality})"
+
+def parse_stream_profiles(spec: str) -> List[StreamProfile]:
+    """Parse `name:max_dim:fps:quality,...` into profiles ordered from best to worst."""
+    profiles = []
+    for item in spec.split(','):
+        name, max_dim, fps, quality = item.strip().split(':')
+        profiles.append(StreamProfile(name, int(max_dim), int(fps), int(quality)))
+    return sorted(profiles, key=lambda p: (p.max_dim, p.fps, p.quality), reverse=True)
+
+STREAM_PROFILES = parse_stream_profiles(CAMERA_STREAM_PROFILES)
+if CAMERA_MJPEG_PASSTHROUGH and STREAM_PROFILES[0].max_dim < max(CAMERA_WIDTH, CAMERA_HEIGHT):
+    # Without a full resolution profile every streamed frame would be decoded and re-encoded
+    STREAM_PROFILES.insert(0, StreamProfile('native', max(CAMERA_WIDTH, CAMERA_HEIGHT), CAMERA_FPS, 95))
+
+def select_profile(name: Optional[str] = None, width: Optional[int] = None, fps: Optional[int] = None, quality: Optional[int] = None) -> StreamProfile:
+    """Pick a profile by name, or the best one that fits within the requested limits."""
+    if name:
+        for profile in STREAM_PROFILES:
+            if profile.name == name:
+                return profile
+        raise ValueError(f"Unknown stream profile {name}, available: {[p.name for p in STREAM_PROFILES]}")
+    for profile in STREAM_PROFILES:
+        if ((width is None or profile.max_dim <= width) and
+                (fps is None or profile.fps <= fps) and
+                (quality is None or profile.quality <= quality)):
+            return profile
+    return STREAM_PROFILES[-1]
+
+def downgrade_profile(profile: StreamProfile) -> Optional[StreamProfile]:
+    """Return the next lower profile, or None if already at the lowest."""
+    position = STREAM_PROFILES.index(profile)
+    if position + 1 < len(STREAM_PROFILES):
+        return STREAM_PROFILES[position + 1]
+    return None
+
+class StreamSubscriber:
+    """One stream client: its bounded frame queue and current profile."""
+    __slots__ = ('queue', 'profile', 'consecutive_drops')
+
+    def __init__(self, profile: StreamProfile):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CAMERA_SUBSCRIBER_QUEUE_SIZE)
+        self.profile = profile
+        self.consecutive_drops = 0
 
 class CameraDevice:
     def __init__(self, index: int, path: str, width: int = CAMERA_WIDTH, height: int = CAMERA_HEIGHT):
@@ -27,54 +170,85 @@ class CameraDevice:
         self.lock = asyncio.Lock()
         self.name = f"Camera {index}"
         self.is_streaming = False
-        self.is_capturing = False
         self.is_active = False
         self.cap = None
+        self.is_source = is_source_spec(path)
+        self.passthrough = CAMERA_MJPEG_PASSTHROUGH and not self.is_source
         self.error_count = 0
         self.last_error_time = 0
-        self._initialize()
+        self.executor = ThreadPoolExecutor(max_workers=CAMERA_IO_THREADS, thread_name_prefix=f"camera{index}")
+        self.stats: Dict[str, RollingStats] = defaultdict(lambda: RollingStats(CAMERA_METRICS_WINDOW, CAMERA_METRICS_BUCKETS_MS))
+        self.grabber = FrameGrabber(self)
+
+    def release(self) -> None:
+        """Release the capture handle. Blocking."""
+        self.is_active = False
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    async def run_io(self, func: Callable[..., Any], *args: Any, stage: Optional[str] = None) -> Any:
+        """Run blocking OpenCV or disk work on this device's executor, off the event loop.
+
+        With `stage` the wall time, including any wait for a free worker, is recorded in `stats`.
+        """
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            if stage:
+                self.stats[stage].record(time.perf_counter() - started)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Machine-readable pipeline metrics for this device."""
+        return {
+            "index": self.index,
+            "active": self.is_active,
+            "streaming": self.is_streaming,
+            "target_fps": CAMERA_FPS,
+            "error_count": self.error_count,
+            **self.grabber.metrics(),
+            "stages": {stage: stats.summary() for stage, stats in self.stats.items()},
+        }
     
     def _initialize(self) -> None:
         try:
-            self.cap = cv2.VideoCapture(self.path)
+            passthrough = CAMERA_MJPEG_PASSTHROUGH and not self.is_source
+            if self.is_source:
+                self.cap = open_source(self.path, self.width, self.height, CAMERA_FPS)
+            elif passthrough:
+                self.cap = cv2.VideoCapture(self.path, cv2.CAP_V4L2)
+            else:
+                self.cap = cv2.VideoCapture(self.path)
             if not self.cap.isOpened():
                 log.error(f"Failed to initialize camera {self.index} at {self.path}")
                 return
+            if passthrough:
+                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            if passthrough:
+                fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+                # Ask OpenCV for the raw compressed buffer instead of decoded BGR
+                self.passthrough = fourcc == cv2.VideoWriter_fourcc(*'MJPG') and self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+                if not self.passthrough:
+                    log.warning(f"Camera {self.index} does not support MJPEG passthrough, decoding frames instead")
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if width > 0 and height > 0:
+                self.width, self.height = width, height
             self.is_active = True
             log.debug(f"Camera {self.index} initialized successfully")
         except Exception as e:
             log.error(f"Camera {self.index} initialization error: {str(e)}")
 
-    async def stop_stream(self):
-        """Safely stop any active stream."""
-        async with self.lock:
-            if self.is_streaming:
-                self.is_streaming = False
-                await asyncio.sleep(CAMERA_STREAM_TOGGLE_DELAY)
-                log.debug(f"Stream stopped for device {self.index}")
-
-    async def start_stream(self):
-        """Safely start stream if not capturing."""
-        if not self.is_capturing:
-            async with self.lock:
-                if not self.is_streaming:
-                    if not self.cap or not self.cap.isOpened():
-                        self._initialize()
-                    if not self.is_active:
-                        log.error(f"Failed to start stream - camera {self.index} not active")
-                        return
-                    self.is_streaming = True
-                    log.debug(f"Stream started for device {self.index}")
-
     async def get_frame(self):
         """Get a single frame from the camera with error handling."""
         current_time = time.time()
         
         if not self.cap or not self.cap.isOpened():
             if current_time - self.last_error_time > 5:  # Only retry every 5 seconds
-                self._initialize()
+                await self.run_io(self._initialize)
                 self.last_error_time = current_time
             return None
             
@@ -82,12 +256,12 @@ class CameraDevice:
             return None
             
         try:
-            ret, frame = self.cap.read()
+            ret, frame = await self.run_io(self.cap.read, stage='read')
             if not ret:
                 self.error_count += 1
                 if self.error_count > 3:  # After 3 consecutive errors
                     self.is_active = False
-                    self.cap.release()
+                    await self.run_io(self.cap.release)
                     self.cap = None
                     log.error(f"Camera {self.index} deactivated after multiple failures")
                 return None
@@ -102,59 +276,330 @@ class CameraDevice:
                 self.last_error_time = current_time
             return None
 
-    async def capture_image(self, device: CameraDevice, filename: str) -> Optional[tuple[str, int, int, int]]:
-        log.debug(f"Starting image capture from device {device.index}")
-        if device.is_streaming:
-            log.debug(f"Stopping stream on device {device.index} before capture")
-            await device.stop_stream()
-        
-        async with device.lock:
-            device.is_capturing = True
-            try:
-                frame = None
-                for attempt in range(3):
-                    log.debug(f"Capture attempt {attempt + 1} for device {device.index}")
-                    frame = await device.get_frame()
-                    if frame is not None:
+class FrameGrabber:
+    """Reads frames from one device once, keeps a ring buffer of recent frames for
+    capture and fans encoded frames out to every stream subscriber.
+
+    Each stream profile in use is encoded once per frame and shared by all of its
+    subscribers. Subscribers that keep dropping frames are moved down a profile.
+    """
+
+    def __init__(self, device: CameraDevice):
+        self.device = device
+        self.subscribers: Set[StreamSubscriber] = set()
+        self.frames: deque[Frame] = deque(maxlen=CAMERA_RING_SIZE)
+        self.dropped_frames = 0
+        self._new_frame = asyncio.Condition()
+        self._warm_until = 0.0
+        self._last_encoded: Dict[str, float] = {}
+        self._read_times: deque[float] = deque(maxlen=CAMERA_METRICS_WINDOW)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _ensure_running(self) -> None:
+        if not self.is_running:
+            self.device.is_streaming = True
+            self._task = asyncio.create_task(self._run())
+
+    def subscribe(self, profile: Optional[StreamProfile] = None) -> StreamSubscriber:
+        """Register a new subscriber and start the grabber if it is not running."""
+        subscriber = StreamSubscriber(profile or STREAM_PROFILES[0])
+        self.subscribers.add(subscriber)
+        log.debug(f"Camera {self.device.index} subscriber added with {subscriber.profile} ({len(self.subscribers)} total)")
+        self._ensure_running()
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber) -> None:
+        """Remove a subscriber, the grabber stops on its own once none are left."""
+        self.subscribers.discard(subscriber)
+        log.debug(f"Camera {self.device.index} subscriber removed ({len(self.subscribers)} left)")
+
+    def keep_warm(self, seconds: float = CAMERA_RING_WARM_TIME) -> None:
+        """Keep the ring buffer filling for a while even with no stream subscribers."""
+        self._warm_until = max(self._warm_until, time.monotonic() + seconds)
+        self._ensure_running()
+
+    def _find_frame(self, after: Optional[float]) -> Optional[Frame]:
+        if not self.frames:
+            return None
+        if after is None:
+            return self.frames[-1]
+        for frame in self.frames:
+            if frame.timestamp >= after:
+                return frame
+        return None
+
+    async def get_frame(self, after: Optional[float] = None, timeout: float = CAMERA_CAPTURE_TIMEOUT) -> Optional[Frame]:
+        """Return the newest buffered frame, or the first one read at or after `after` (epoch seconds)."""
+        self.keep_warm()
+        try:
+            async with self._new_frame:
+                return await asyncio.wait_for(
+                    self._new_frame.wait_for(lambda: self._find_frame(after)),
+                    timeout=timeout
+                )
+        except asyncio.TimeoutError:
+            log.error(f"No frame available from camera {self.device.index} within {timeout}s")
+            return None
+
+    async def get_burst(self, count: int, after: Optional[float] = None, window: float = CAMERA_BURST_WINDOW) -> List[Frame]:
+        """Collect up to `count` consecutive frames read within `window` seconds of the first one."""
+        first = await self.get_frame(after=after)
+        if first is None:
+            return []
+        frames = [first]
+        deadline = first.timestamp + window
+        while len(frames) < count:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            frame = await self.get_frame(after=frames[-1].timestamp + 1e-6, timeout=remaining)
+            if frame is None or frame.timestamp > deadline:
+                break
+            frames.append(frame)
+        return frames
+
+    def metrics(self) -> Dict[str, Any]:
+        achieved_fps = 0.0
+        if len(self._read_times) > 1 and self._read_times[-1] > self._read_times[0]:
+            achieved_fps = (len(self._read_times) - 1) / (self._read_times[-1] - self._read_times[0])
+        by_profile: Dict[str, int] = defaultdict(int)
+        for subscriber in self.subscribers:
+            by_profile[subscriber.profile.name] += 1
+        return {
+            "grabber_running": self.is_running,
+            "achieved_fps": round(achieved_fps, 2),
+            "dropped_frames": self.dropped_frames,
+            "subscribers": len(self.subscribers),
+            "subscribers_by_profile": dict(by_profile),
+            "queued_frames": sum(subscriber.queue.qsize() for subscriber in self.subscribers),
+            "ring_frames": len(self.frames),
+        }
+
+    def _publish(self, payload: Optional[bytes], profile: Optional[StreamProfile] = None) -> None:
+        """Push payload to subscribers of profile (all if None), dropping the oldest
+        queued frame for slow clients and downgrading those that keep falling behind."""
+        for subscriber in list(self.subscribers):
+            if profile is not None and subscriber.profile is not profile:
+                continue
+            queue = subscriber.queue
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                    self.dropped_frames += 1
+                    subscriber.consecutive_drops += 1
+                except asyncio.QueueEmpty:
+                    pass
+            else:
+                subscriber.consecutive_drops = 0
+            queue.put_nowait(payload)
+
+            if payload is not None and subscriber.consecutive_drops >= CAMERA_DOWNGRADE_DROPS:
+                lower = downgrade_profile(subscriber.profile)
+                if lower:
+                    log.info(f"Camera {self.device.index} subscriber falling behind, downgrading {subscriber.profile.name} -> {lower.name}")
+                    subscriber.profile = lower
+                subscriber.consecutive_drops = 0
+
+    @staticmethod
+    def _can_passthrough(frame: Frame, profile: StreamProfile) -> bool:
+        return frame.jpeg is not None and max(frame.width, frame.height) <= profile.max_dim
+
+    def _encode(self, frame: Frame, profile: StreamProfile) -> bytes:
+        if self._can_passthrough(frame, profile):
+            return frame.jpeg.tobytes()
+        image = frame.decode()
+        height, width = image.shape[:2]
+        target_dim = min(profile.max_dim, width, height)
+        scale = min(target_dim/width, target_dim/height)
+        new_width = int(width * scale)
+        new_height = int(height * scale)
+        if new_width != width or new_height != height:
+            image = cv2.resize(image, (new_width, new_height))
+        params = [cv2.IMWRITE_JPEG_QUALITY, profile.quality] if CAMERA_IMG_TYPE in ('jpg', 'jpeg') else []
+        _, buffer = cv2.imencode(f'.{CAMERA_IMG_TYPE}', image, params)
+        return buffer.tobytes()
+
+    def _due_profiles(self, now: float) -> List[StreamProfile]:
+        """Profiles with subscribers whose next frame is due at `now`."""
+        due = []
+        for profile in {subscriber.profile for subscriber in self.subscribers}:
+            if now - self._last_encoded.get(profile.name, 0.0) >= 1/profile.fps - 0.005:
+                due.append(profile)
+                self._last_encoded[profile.name] = now
+        return due
+
+    async def _encode_and_publish(self, frame: Frame, profile: StreamProfile) -> None:
+        try:
+            payload = await self.device.run_io(self._encode, frame, profile, stage='encode')
+            self._publish(payload, profile)
+        except Exception as e:
+            log.error(f"Frame encoding error for {profile}: {str(e)}")
+
+    async def _run(self) -> None:
+        device = self.device
+
+        log.debug(f"Frame grabber started for device {device.index}")
+        consecutive_failures = 0
+        try:
+            # Open the camera up front so the first read does not count as a failure
+            async with device.lock:
+                if not device.cap or not device.cap.isOpened():
+                    await device.run_io(device._initialize)
+            while self.subscribers or time.monotonic() < self._warm_until:
+                started = time.monotonic()
+                # Read as fast as the most demanding subscriber needs, or CAMERA_FPS for capture only
+                fps = max((subscriber.profile.fps for subscriber in self.subscribers), default=CAMERA_FPS)
+                frame_interval = 1/fps
+
+                async with device.lock:
+                    image = await device.get_frame()
+                if image is None:
+                    consecutive_failures += 1
+                    if consecutive_failures > 5:  # After 5 consecutive failures
+                        log.error(f"Stream ended due to multiple failures on camera {device.index}")
                         break
-                    log.warning(f"Capture attempt {attempt + 1} failed, retrying...")
-                    await asyncio.sleep(0.2)
+                    await asyncio.sleep(1)  # Add delay between retries
+                    continue
 
-                if frame is None:
-                    log.error(f"All capture attempts failed for device {device.index}")
-                    return None
+                consecutive_failures = 0  # Reset on successful frame
+                self._read_times.append(time.monotonic())
+                if device.passthrough and image.ndim < 3:
+                    frame = Frame(time.time(), jpeg=image, width=device.width, height=device.height)
+                else:
+                    frame = Frame(time.time(), image=image)
+                self.frames.append(frame)
+                async with self._new_frame:
+                    self._new_frame.notify_all()
 
-                filepath = os.path.join(IMAGES_DIR, filename)
-                
-                log.debug(f"Saving captured image to {filepath}")
-                if cv2.imwrite(filepath, frame):
-                    os.chmod(filepath, 0o644)
-                    height, width = frame.shape[:2]
-                    file_size = os.path.getsize(filepath)
-                    log.debug(f"Image saved successfully - dimensions: {width}x{height}, size: {file_size} bytes")
-                    await self._cleanup_old_images()
-                    return filepath, width, height, file_size
-
-                log.error(f"Failed to write image to {filepath}")
-                return None
-            except Exception as e:
-                log.error(f"Capture error: {str(e)}", exc_info=True)
-                return None
-            finally:
-                device.is_capturing = False
+                due = self._due_profiles(started)
+                if due:
+                    if not all(self._can_passthrough(frame, profile) for profile in due):
+                        # Decode once up front rather than once per profile
+                        await device.run_io(frame.decode, stage='decode')
+                    await asyncio.gather(*(self._encode_and_publish(frame, profile) for profile in due))
+                device.stats['frame'].record(time.monotonic() - started)
+                await asyncio.sleep(max(0.0, frame_interval - (time.monotonic() - started)))
+        except Exception as e:
+            log.error(f"Frame grabber error: {str(e)}", exc_info=True)
+        finally:
+            self._publish(None)  # Signal end of stream to remaining subscribers
+            self.subscribers.clear()
+            self.frames.clear()
+            self._last_encoded.clear()
+            self._read_times.clear()
+            self._warm_until = 0.0
+            device.is_streaming = False
+            log.debug(f"Frame grabber stopped for device {device.index}")
+
+class ImageRetention:
+    """Min-heap of saved images ordered by mtime, loaded from disk once at startup.
+
+    Evicts the oldest images in O(log N) each when there are more than `max_images`
+    or free disk space drops below `min_free_mb`, and deletes their DBImage rows
+    in the same batch. Low disk space evicts at most `max_space_evictions` images
+    per call, and only one when evicting every image could not free enough, so
+    space taken by other data does not wipe out the image history. Methods block,
+    so call them from an executor.
+    """
+
+    def __init__(self, directory: str = IMAGES_DIR, max_images: int = CAMERA_MAX_IMAGES, min_free_mb: int = CAMERA_MIN_FREE_SPACE_MB,
+                 max_space_evictions: int = CAMERA_MAX_SPACE_EVICTIONS):
+        self.directory = directory
+        self.max_images = max_images
+        self.min_free_bytes = min_free_mb * 1024 * 1024
+        self.max_space_evictions = max_space_evictions
+        self._last_space_warning = 0.0
+        self._heap: List[tuple[float, str, int]] = []
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Build the index with a single directory scan."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(CAMERA_IMG_TYPE):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        heapq.heapify(entries)
+        with self._lock:
+            self._heap = entries
+            self._bytes = sum(size for _, _, size in entries)
+        log.info(f"Image retention index loaded with {len(entries)} images")
+
+    def add(self, filepath: str, file_size: int) -> List[str]:
+        """Index a newly written image and evict as needed, returns evicted paths."""
+        with self._lock:
+            heapq.heappush(self._heap, (time.time(), filepath, file_size))
+            self._bytes += file_size
+            return self._evict()
+
+    def _evict(self) -> List[str]:
+        free_bytes = shutil.disk_usage(self.directory).free
+        evicted = []
+        space_evictions = 0
+        max_space_evictions = self.max_space_evictions
+        if self.min_free_bytes - free_bytes > self._bytes:
+            # Images cannot make up the shortfall, only offset the one just added
+            max_space_evictions = min(max_space_evictions, 1)
+        # Never evict the image that was just added
+        while len(self._heap) > 1:
+            if len(self._heap) <= self.max_images:
+                if free_bytes >= self.min_free_bytes or space_evictions >= max_space_evictions:
+                    break
+                space_evictions += 1
+            _, filepath, file_size = heapq.heappop(self._heap)
+            self._bytes -= file_size
+            try:
+                os.remove(filepath)
+                free_bytes += file_size
+            except FileNotFoundError:
+                pass
+            evicted.append(filepath)
+        if free_bytes < self.min_free_bytes and time.monotonic() - self._last_space_warning > 60:
+            self._last_space_warning = time.monotonic()
+            log.warning(f"Free disk space {free_bytes / 1024 / 1024:.0f}MB below CAMERA_MIN_FREE_SPACE_MB "
+                        f"{self.min_free_bytes / 1024 / 1024:.0f}MB, evicted {space_evictions} images for space")
+        if not evicted:
+            return evicted
+
+        try:
+            with get_db_session() as db:
+                deleted = db.query(DBImage)\
+                    .filter(DBImage.filepath.in_(evicted))\
+                    .delete(synchronize_session=False)
+            log.info(f"Evicted {len(evicted)} old images and {deleted} image records")
+        except Exception as e:
+            log.error(f"Failed to delete evicted image records: {str(e)}", exc_info=True)
+        return evicted
 
 class CameraManager:
     def __init__(self):
         self.devices: Dict[int, CameraDevice] = {}
+        self.retention = ImageRetention()
+        self._probe_tasks: List[asyncio.Task] = []
         self._init_lock = asyncio.Lock()
         
     async def initialize(self) -> None:
+        """Start probing every configured device concurrently and return without waiting.
+
+        Each device is opened once on its own executor thread and published in
+        `devices` as soon as it is ready. Use `wait_ready` to wait for all probes.
+        """
         log.debug("Starting camera device initialization")
         async with self._init_lock:
+            await asyncio.to_thread(self.retention.load)
             device_indices = os.getenv('CAMERA_DEVICES', '0').split(',')
             log.debug(f"Found {len(device_indices)} camera device indices in config")
             
+            candidates = []
             for idx in device_indices:
+                if not idx.strip():
+                    continue
                 try:
                     index = int(idx.strip())
                     path = f"/dev/video{index}"
@@ -163,138 +608,170 @@ class CameraManager:
                     if not os.path.exists(path):
                         log.error(f"Camera device path {path} does not exist")
                         continue
-                        
-                    log.debug(f"Attempting to open camera {index} for testing")
-                    cap = cv2.VideoCapture(path)
-                    if cap.isOpened():
-                        device = CameraDevice(index=index, path=path)
-                        device.is_active = True
-                        self.devices[index] = device
-                        log.info(f"Successfully initialized camera {index} at {path}")
-                        cap.release()
-                        log.debug(f"Released test capture for camera {index}")
-                    else:
-                        log.error(f"Camera {index} exists but failed to open - check permissions")
+                    candidates.append(CameraDevice(index=index, path=path))
                         
                 except ValueError as e:
                     log.error(f"Invalid camera index format {idx}: {str(e)}")
-                except Exception as e:
-                    log.error(f"Unexpected error initializing camera {idx}: {str(e)}", exc_info=True)
-                    
-            log.info(f"Camera initialization complete - {len(self.devices)} active devices")
+
+            # Software sources for benchmarking without hardware, e.g. 10=synthetic:1280x720@30
+            for entry in CAMERA_SOURCES.split(','):
+                if not entry.strip():
+                    continue
+                try:
+                    idx, spec = entry.split('=', 1)
+                    candidates.append(CameraDevice(index=int(idx.strip()), path=spec.strip()))
+                except ValueError as e:
+                    log.error(f"Invalid camera source {entry}, expected index=spec: {str(e)}")
+
+            self._probe_tasks = [asyncio.create_task(self._probe(device)) for device in candidates]
+            log.info(f"Probing {len(candidates)} camera devices")
+
+    async def wait_ready(self) -> None:
+        """Wait until every device probe started by `initialize` has finished."""
+        await asyncio.gather(*self._probe_tasks, return_exceptions=True)
+        log.info(f"Camera initialization complete - {len(self.devices)} active devices")
+
+    async def _probe(self, device: CameraDevice) -> None:
+        log.debug(f"Opening camera {device.index} at {device.path}")
+        started = time.perf_counter()
+        future: Future = device.executor.submit(device._initialize)
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(future), timeout=CAMERA_PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.error(f"Camera {device.index} at {device.path} did not open within {CAMERA_PROBE_TIMEOUT}s, skipping")
+            # The open cannot be interrupted, release the handle if it ever completes
+            future.add_done_callback(lambda _: device.release())
+            return
+        except Exception as e:
+            log.error(f"Unexpected error initializing camera {device.index}: {str(e)}", exc_info=True)
+            return
+        device.stats['open'].record(time.perf_counter() - started)
+
+        if device.is_active:
+            self.devices[device.index] = device
+            log.info(f"Successfully initialized camera {device.index} at {device.path}")
+        else:
+            log.error(f"Camera {device.index} at {device.path} failed to open - check permissions")
 
     def get_device(self, index: int) -> Optional[CameraDevice]:
         return self.devices.get(index)
 
-    async def capture_image(self, device: CameraDevice, filename: str) -> Optional[tuple[str, int, int, int]]:
-        log.debug(f"Starting image capture from device {device.index}")
-        if device.is_streaming:
-            log.debug(f"Stopping stream on device {device.index} before capture")
-            await device.stop_stream()
-        
-        async with device.lock:
-            device.is_capturing = True
-            try:
-                frame = None
-                for attempt in range(3):
-                    log.debug(f"Capture attempt {attempt + 1} for device {device.index}")
-                    frame = await device.get_frame()
-                    if frame is not None:
-                        break
-                    log.warning(f"Capture attempt {attempt + 1} failed, retrying...")
-                    await asyncio.sleep(0.2)
+    async def capture_image(self, device: CameraDevice, filename: str, after: Optional[float] = None, burst: int = 1) -> Optional[CaptureResult]:
+        """Save a frame from the device's ring buffer without interrupting the live stream.
 
-                if frame is None:
-                    log.error(f"All capture attempts failed for device {device.index}")
+        With `after` (epoch seconds) the first frame read at or after that time is used,
+        otherwise the newest buffered frame. With `burst` > 1 that many frames are taken
+        over CAMERA_BURST_WINDOW and only the sharpest one is saved.
+        """
+        log.debug(f"Starting image capture from device {device.index}")
+        started = time.perf_counter()
+        try:
+            if burst > 1:
+                frames = await device.grabber.get_burst(burst, after=after)
+                if not frames:
+                    log.error(f"Capture failed, no frame available from device {device.index}")
                     return None
+                scores = await device.run_io(lambda: [sharpness(frame.decode()) for frame in frames], stage='score')
+                best = max(range(len(frames)), key=scores.__getitem__)
+                log.debug(f"Burst of {len(frames)} frames on device {device.index}, sharpness {[round(score, 1) for score in scores]}, kept #{best}")
+                return await self._save_frame(device, frames[best], filename, scores[best])
 
-                filepath = os.path.join(IMAGES_DIR, filename)
-                
-                log.debug(f"Saving captured image to {filepath}")
-                if cv2.imwrite(filepath, frame):
-                    os.chmod(filepath, 0o644)
-                    height, width = frame.shape[:2]
-                    file_size = os.path.getsize(filepath)
-                    log.debug(f"Image saved successfully - dimensions: {width}x{height}, size: {file_size} bytes")
-                    await self._cleanup_old_images()
-                    return filepath, width, height, file_size
-
-                log.error(f"Failed to write image to {filepath}")
+            frame = await device.grabber.get_frame(after=after)
+            if frame is None:
+                log.error(f"Capture failed, no frame available from device {device.index}")
                 return None
-            except Exception as e:
-                log.error(f"Capture error: {str(e)}", exc_info=True)
+            return await self._save_frame(device, frame, filename)
+        except Exception as e:
+            log.error(f"Capture error: {str(e)}", exc_info=True)
+            return None
+        finally:
+            device.stats['capture'].record(time.perf_counter() - started)
+
+    async def capture_all(self, filenames: Dict[int, str], after: Optional[float] = None) -> Dict[int, Optional[CaptureResult]]:
+        """Capture from every device in `filenames` at once, frames within CAMERA_SYNC_WINDOW of each other.
+
+        Frames are grabbed and written concurrently. Returns a result per device index,
+        None where that device failed.
+        """
+        devices = [self.devices[index] for index in filenames if index in self.devices and self.devices[index].is_active]
+        if not devices:
+            return {index: None for index in filenames}
+        after = after if after is not None else time.time()
+        log.debug(f"Starting synchronized capture on devices {[d.index for d in devices]}")
+        frames = await asyncio.gather(*(device.grabber.get_frame(after=after) for device in devices))
+        timestamps = [frame.timestamp for frame in frames if frame is not None]
+        if timestamps and max(timestamps) - min(timestamps) > CAMERA_SYNC_WINDOW:
+            # Realign on the slowest device, every grabber is now warm so the next frames arrive together
+            after = max(timestamps)
+            frames = await asyncio.gather(*(device.grabber.get_frame(after=after) for device in devices))
+            timestamps = [frame.timestamp for frame in frames if frame is not None]
+            if timestamps and max(timestamps) - min(timestamps) > CAMERA_SYNC_WINDOW:
+                log.warning(f"Synchronized capture spread {(max(timestamps) - min(timestamps)) * 1000:.0f}ms exceeds window")
+
+        async def save(device: CameraDevice, frame: Optional[Frame]) -> Optional[CaptureResult]:
+            if frame is None:
+                log.error(f"Capture failed, no frame available from device {device.index}")
                 return None
-            finally:
-                device.is_capturing = False
+            return await self._save_frame(device, frame, filenames[device.index])
+
+        saved = await asyncio.gather(*(save(d, f) for d, f in zip(devices, frames)), return_exceptions=True)
+        results: Dict[int, Optional[CaptureResult]] = {index: None for index in filenames}
+        for device, result in zip(devices, saved):
+            if isinstance(result, Exception):
+                log.error(f"Capture error on device {device.index}: {str(result)}")
+                continue
+            results[device.index] = result
+        return results
 
-    async def generate_frames(self, device: CameraDevice) -> AsyncGenerator[bytes, None]:
+    async def _save_frame(self, device: CameraDevice, frame: Frame, filename: str, score: Optional[float] = None) -> Optional[CaptureResult]:
+        filepath = os.path.join(IMAGES_DIR, filename)
+        log.debug(f"Saving captured image to {filepath}")
+        file_size = await device.run_io(self._write_image, filepath, frame, stage='write')
+        if file_size is None:
+            log.error(f"Failed to write image to {filepath}")
+            return None
+        image = await device.run_io(frame.decode, stage='decode')
+        if score is None:
+            score = await device.run_io(sharpness, image, stage='score')
+        frame_fingerprint = await device.run_io(fingerprint, image, stage='score')
+        width, height = frame.width, frame.height
+        log.debug(f"Image saved successfully - dimensions: {width}x{height}, size: {file_size} bytes, sharpness: {score:.1f}")
+        await device.run_io(self.retention.add, filepath, file_size, stage='retention')
+        return CaptureResult(filepath, width, height, file_size, score, frame_fingerprint)
+
+    async def generate_frames(self, device: CameraDevice, profile: Optional[StreamProfile] = None) -> AsyncGenerator[bytes, None]:
+        """Yield MJPEG parts for one client from the device's shared frame grabber."""
         if not device:
             log.error("No camera device provided")
             return
-        
-        if device.is_capturing:
-            log.info(f"Camera {device.index} is currently capturing, waiting...")
-            await asyncio.sleep(1)
-        
+
+        subscriber = device.grabber.subscribe(profile)
         try:
-            async with device.lock:
-                if not device.is_streaming:
-                    device.is_streaming = True
-                    log.debug(f"Stream started for device {device.index}")
-                
-                target_dim = min(CAMERA_MAX_DIM, device.width, device.height)
-                scale = min(target_dim/device.width, target_dim/device.height)
-                new_width = int(device.width * scale)
-                new_height = int(device.height * scale)
-            
-            consecutive_failures = 0
-            while device.is_streaming and not device.is_capturing:
-                frame = await device.get_frame()
-                if frame is None:
-                    consecutive_failures += 1
-                    if consecutive_failures > 5:  # After 5 consecutive failures
-                        log.error(f"Stream ended due to multiple failures on camera {device.index}")
-                        break
-                    await asyncio.sleep(1)  # Add delay between retries
-                    continue
-                
-                consecutive_failures = 0  # Reset on successful frame
-                try:
-                    if new_width != device.width or new_height != device.height:
-                        frame = cv2.resize(frame, (new_width, new_height))
-                    
-                    _, buffer = cv2.imencode(f'.{CAMERA_IMG_TYPE}', frame)
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                    await asyncio.sleep(1/CAMERA_FPS)
-                except Exception as e:
-                    log.error(f"Frame encoding error: {str(e)}")
-                    await asyncio.sleep(0.1)
-                    continue
-        
+            while True:
+                payload = await subscriber.queue.get()
+                if payload is None:
+                    break
+                sent = time.perf_counter()
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + payload + b'\r\n')
+                # Time until the client asks for the next part, i.e. network back-pressure
+                device.stats['send'].record(time.perf_counter() - sent)
         except Exception as e:
             log.error(f"Stream error: {str(e)}", exc_info=True)
         finally:
-            device.is_streaming = False
-
-    async def _cleanup_old_images(self) -> None:
-        """Remove old images when exceeding maximum count."""
-        try:
-            images = []
-            for filename in os.listdir(IMAGES_DIR):
-                if filename.endswith(CAMERA_IMG_TYPE):
-                    filepath = os.path.join(IMAGES_DIR, filename)
-                    timestamp = datetime.fromtimestamp(os.path.getmtime(filepath))
-                    images.append((filepath, timestamp))
-
-            if len(images) <= CAMERA_MAX_IMAGES:
-                return
+            device.grabber.unsubscribe(subscriber)
 
-            images.sort(key=lambda x: x[1], reverse=True)
-            for filepath, _ in images[CAMERA_MAX_IMAGES:]:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                    log.info(f"Cleaned up old image: {filepath}")
+    @staticmethod
+    def _write_image(filepath: str, frame: Frame) -> Optional[int]:
+        """Write frame to disk and return its size in bytes, or None on failure.
 
-        except Exception as e:
-            log.error(f"Image cleanup error: {str(e)}", exc_info=True)
+        MJPEG passthrough frames are written as-is when saving JPEGs, skipping the
+        decode and re-encode.
+        """
+        if frame.jpeg is not None and CAMERA_IMG_TYPE in ('jpg', 'jpeg'):
+            with open(filepath, 'wb') as f:
+                f.write(frame.jpeg.tobytes())
+        elif not cv2.imwrite(filepath, frame.decode()):
+            return None
+        os.chmod(filepath, 0o644)
+        return os.path.getsize(filepath)
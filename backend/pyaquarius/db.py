@@ -0,0 +1,75 @@
+"""SQLite engines for the backend: one writer connection and a pool of readers.
+
+In performance mode the database runs in WAL mode, so readers never wait for
+the writer. All writes share one connection and queue on its pool in-process
+instead of retrying on a busy database. Reads go through a separate pool of
+query-only connections.
+"""
+import logging
+import os
+from typing import Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+log = logging.getLogger(__name__)
+
+DB_PERFORMANCE_MODE = os.getenv('DB_PERFORMANCE_MODE', 'true').lower() == 'true'  # WAL, tuned pragmas and the read/write engine split
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', '4'))  # Read-only connections
+DB_WRITE_TIMEOUT = float(os.getenv('DB_WRITE_TIMEOUT', '30'))  # Seconds a write waits for the writer connection
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))  # Wait on a lock held by another process before failing
+DB_CACHE_SIZE_MB = int(os.getenv('DB_CACHE_SIZE_MB', '32'))  # Page cache per connection
+DB_MMAP_SIZE_MB = int(os.getenv('DB_MMAP_SIZE_MB', '256'))  # Memory-mapped I/O, 0 to disable
+
+def _set_pragmas(engine: Engine, query_only: bool) -> None:
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not query_only:
+            # Persistent in the database file, readers pick it up from there
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_MB * 1024}")
+        cursor.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE_MB * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if query_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def create_engines(url: str, performance: bool = DB_PERFORMANCE_MODE) -> Tuple[Engine, Engine]:
+    """Writer and reader engines for url, the same engine twice outside performance mode or for in-memory databases."""
+    parsed = make_url(url)
+    if not performance or parsed.get_backend_name() != 'sqlite' or parsed.database in (None, '', ':memory:'):
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            pool_size=5,
+            max_overflow=10
+        )
+        return engine, engine
+
+    writer = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_WRITE_TIMEOUT
+    )
+    _set_pragmas(writer, query_only=False)
+    # Open the writer first so the database is in WAL mode before any reader connects
+    writer.connect().close()
+
+    reader = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=DB_READ_POOL_SIZE,
+        max_overflow=DB_READ_POOL_SIZE
+    )
+    _set_pragmas(reader, query_only=True)
+    log.info(f"SQLite performance mode: WAL, 1 writer, {DB_READ_POOL_SIZE} readers")
+    return writer, reader
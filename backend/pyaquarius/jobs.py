@@ -0,0 +1,177 @@
+"""Durable queue of AI analysis jobs drained by a bounded pool of workers.
+
+Jobs are rows in the analysis_jobs table, so queued work survives a restart:
+on start, jobs left queued or running are put back on the queue. The HTTP
+request that enqueues a job returns its id immediately; status and results
+are polled from the table, and a job with a callback_url is POSTed there when
+it finishes.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from pyaquarius.ai import async_inference
+from pyaquarius.ai_scheduler import PRIORITY_INTERACTIVE
+from pyaquarius.models import AnalysisJob, DBAnalysisJob, DBImage, get_db_session, get_read_session
+
+log = logging.getLogger(__name__)
+
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2'))
+ANALYSIS_QUEUE_MAX = int(os.getenv('ANALYSIS_QUEUE_MAX', '100'))  # Jobs waiting beyond this are rejected
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv('ANALYSIS_JOB_MAX_ATTEMPTS', '2'))  # Runs interrupted by restarts before a job fails
+ANALYSIS_CALLBACK_TIMEOUT = int(os.getenv('ANALYSIS_CALLBACK_TIMEOUT', '10'))
+ANALYSIS_CALLBACK_HOSTS = {h.strip().lower() for h in os.getenv('ANALYSIS_CALLBACK_HOSTS', '').split(',') if h.strip()}  # Hosts job callbacks may be sent to, empty disables callbacks
+
+class QueueFullError(Exception):
+    pass
+
+def validate_callback_url(callback_url: str) -> None:
+    """Reject callback URLs that are not http(s) on an allowed host, so clients cannot make the server call arbitrary hosts."""
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError("Callback URL must be an http or https URL")
+    if parsed.hostname.lower() not in ANALYSIS_CALLBACK_HOSTS:
+        raise ValueError(f"Callbacks to {parsed.hostname} are not allowed")
+
+class AnalysisJobQueue:
+    def __init__(self, workers: int = ANALYSIS_WORKERS, max_queued: int = ANALYSIS_QUEUE_MAX):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Requeue unfinished jobs from the table and start the workers."""
+        self._queue = asyncio.PriorityQueue()
+        with get_db_session() as db:
+            pending = db.query(DBAnalysisJob)\
+                .filter(DBAnalysisJob.status.in_(['queued', 'running']))\
+                .order_by(DBAnalysisJob.created_at)\
+                .all()
+            for job in pending:
+                job.status = 'queued'
+                self._queue.put_nowait((job.priority, next(self._seq), job.id))
+        if pending:
+            log.info(f"Requeued {len(pending)} unfinished analysis jobs")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        log.info(f"Started {self.workers} analysis workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def enqueue(self, ai_models: List[str], analyses: List[str], image_id: str, tank_id: int = 0,
+                priority: int = PRIORITY_INTERACTIVE, callback_url: Optional[str] = None) -> AnalysisJob:
+        if self._queue is None:
+            raise RuntimeError("Analysis job queue not started")
+        if callback_url:
+            validate_callback_url(callback_url)
+        if self.queued >= self.max_queued:
+            raise QueueFullError(f"{self.queued} analysis jobs already queued")
+        with get_db_session() as db:
+            job = DBAnalysisJob(
+                id=uuid.uuid4().hex,
+                status='queued',
+                ai_models=','.join(ai_models),
+                analyses=','.join(analyses),
+                image_id=image_id,
+                tank_id=tank_id,
+                priority=priority,
+                callback_url=callback_url,
+            )
+            db.add(job)
+            db.flush()
+            queued = AnalysisJob.from_orm(job)
+        self._queue.put_nowait((priority, next(self._seq), queued.id))
+        log.info(f"Queued analysis job {queued.id}: {ai_models} {analyses} on image {image_id}")
+        return queued
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with get_read_session() as db:
+            job = db.query(DBAnalysisJob).filter(DBAnalysisJob.id == job_id).first()
+            return AnalysisJob.from_orm(job) if job else None
+
+    def recent(self, status: Optional[str] = None, limit: int = 20) -> List[AnalysisJob]:
+        with get_read_session() as db:
+            query = db.query(DBAnalysisJob)
+            if status:
+                query = query.filter(DBAnalysisJob.status == status)
+            return [AnalysisJob.from_orm(job) for job in query.order_by(DBAnalysisJob.created_at.desc()).limit(limit)]
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                log.error(f"Analysis worker {worker_id} failed on job {job_id}: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        with get_db_session() as db:
+            job = db.query(DBAnalysisJob).filter(DBAnalysisJob.id == job_id).first()
+            if not job or job.status != 'queued':
+                return
+            job.attempts = (job.attempts or 0) + 1
+            if job.attempts > ANALYSIS_JOB_MAX_ATTEMPTS:
+                job.status = 'failed'
+                job.error = f"Gave up after {job.attempts - 1} interrupted attempts"
+                job.finished_at = datetime.utcnow()
+                return
+            image = db.query(DBImage).filter(DBImage.id == job.image_id).first()
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            ai_models, analyses = job.ai_models.split(','), job.analyses.split(',')
+            image_id, tank_id, priority = job.image_id, job.tank_id, job.priority
+            filepath = image.filepath if image else None
+
+        log.debug(f"Running analysis job {job_id}")
+        result: Optional[Dict[str, Any]] = None
+        error = None
+        if filepath is None:
+            error = f"Image {image_id} not found"
+        else:
+            result = await async_inference(ai_models, analyses, filepath, tank_id=tank_id, image_id=image_id, priority=priority)
+            if set(result) == {'error'}:
+                error, result = result['error'], None
+
+        with get_db_session() as db:
+            job = db.query(DBAnalysisJob).filter(DBAnalysisJob.id == job_id).first()
+            job.status = 'failed' if error else 'done'
+            job.result = json.dumps(result) if result is not None else None
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            callback_url = job.callback_url
+            finished = AnalysisJob.from_orm(job)
+        log.info(f"Analysis job {job_id} {finished.status}")
+        if callback_url:
+            await asyncio.to_thread(self._notify, callback_url, finished)
+
+    @staticmethod
+    def _notify(callback_url: str, job: AnalysisJob) -> None:
+        try:
+            requests.post(callback_url, data=job.json(), headers={'Content-Type': 'application/json'},
+                          timeout=ANALYSIS_CALLBACK_TIMEOUT, allow_redirects=False)
+        except requests.RequestException as e:
+            log.warning(f"Callback for analysis job {job.id} to {callback_url} failed: {str(e)}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "queued": self.queued, "max_queued": self.max_queued}
+
+job_queue = AnalysisJobQueue()
@@ -0,0 +1,158 @@
+"""In-memory lookup of life records by emoji, common name and scientific name.
+
+Models answer identify_life with an emoji and two names per row, and the same
+emoji often covers several species (both bettas are 🦈) or comes back as a
+different variant of the same glyph. The index normalizes all three keys and
+resolves a row by the most specific one that points at a single life record,
+falling back to fuzzy name matching. The emoji and scientific name from the
+ainotes/life.csv row with the same common name are kept as aliases, so records
+edited through the API still match what models return.
+
+The index is loaded from the life table on first use and updated in place
+when life is added or edited, so resolving an analysis needs no queries.
+"""
+import csv
+import difflib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pyaquarius.models import DBLife, LIFE_CSV_PATH, get_read_session
+
+log = logging.getLogger(__name__)
+
+LIFE_MATCH_CUTOFF = float(os.getenv('LIFE_MATCH_CUTOFF', '0.85'))  # Minimum similarity for a fuzzy name match, 1 disables fuzzy matching
+
+# Variation selectors, zero width joiner and skin tone modifiers
+EMOJI_IGNORED = re.compile('[\ufe0e\ufe0f\u200d\U0001F3FB-\U0001F3FF]')
+NAME_IGNORED = re.compile(r'[^a-z0-9 ]+')
+
+def emoji_key(emoji: Optional[str]) -> str:
+    return EMOJI_IGNORED.sub('', unicodedata.normalize('NFC', (emoji or '').strip()))
+
+def name_key(name: Optional[str]) -> str:
+    name = unicodedata.normalize('NFKD', (name or '').lower())
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(NAME_IGNORED.sub(' ', name).split())
+
+class LifeIndex:
+    def __init__(self, csv_path: str = LIFE_CSV_PATH, cutoff: float = LIFE_MATCH_CUTOFF):
+        self.csv_path = csv_path
+        self.cutoff = cutoff
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._keys: Dict[str, List[Tuple[str, str]]] = {}  # life_id -> [(kind, key)]
+        self._by: Dict[str, Dict[str, Set[str]]] = {'emoji': {}, 'common': {}, 'scientific': {}}
+        self._catalog: List[Tuple[str, str, str]] = []
+        self.matches: Dict[str, int] = {}
+        self.misses = 0
+
+    def _load_catalog(self) -> None:
+        try:
+            with open(self.csv_path, mode='r') as csvfile:
+                self._catalog = [(emoji_key(row['emoji']), name_key(row['common_name']), name_key(row['scientific_name']))
+                                 for row in csv.DictReader(csvfile)]
+        except (OSError, KeyError) as e:
+            log.warning(f"Could not read life catalog {self.csv_path}: {str(e)}")
+            self._catalog = []
+
+    def load(self, lives: Optional[Iterable[Any]] = None) -> None:
+        """Rebuild the index from the given life records, or from the life table."""
+        if lives is None:
+            with get_read_session() as db:
+                lives = [(l.id, l.emoji, l.common_name, l.scientific_name) for l in db.query(DBLife).all()]
+        else:
+            lives = [(l.id, l.emoji, l.common_name, l.scientific_name) for l in lives]
+        with self._lock:
+            self._load_catalog()
+            self._keys = {}
+            self._by = {'emoji': {}, 'common': {}, 'scientific': {}}
+            for life in lives:
+                self._add(*life)
+            self._loaded = True
+        log.info(f"Indexed {len(self._keys)} life records")
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def _add(self, life_id: str, emoji: Optional[str], common_name: Optional[str], scientific_name: Optional[str]) -> None:
+        keys = {('emoji', emoji_key(emoji)), ('common', name_key(common_name)), ('scientific', name_key(scientific_name))}
+        for alias_emoji, alias_common, alias_scientific in self._catalog:
+            if alias_common and alias_common == name_key(common_name):
+                keys |= {('emoji', alias_emoji), ('scientific', alias_scientific)}
+        keys = [(kind, key) for kind, key in keys if key]
+        self._keys[life_id] = keys
+        for kind, key in keys:
+            self._by[kind].setdefault(key, set()).add(life_id)
+
+    def _remove(self, life_id: str) -> None:
+        for kind, key in self._keys.pop(life_id, []):
+            ids = self._by[kind].get(key)
+            if ids is not None:
+                ids.discard(life_id)
+                if not ids:
+                    del self._by[kind][key]
+
+    def upsert(self, life: Any) -> None:
+        """Add or re-index a single life record after it was created or edited."""
+        self._ensure_loaded()
+        with self._lock:
+            self._remove(life.id)
+            self._add(life.id, life.emoji, life.common_name, life.scientific_name)
+
+    def _contradicts(self, life_id: str, common: str, scientific: str) -> bool:
+        """True if a given name is not even a fuzzy match for any of the record's names of that kind."""
+        keys = self._keys.get(life_id, [])
+        for kind, name in (('common', common), ('scientific', scientific)):
+            if not name:
+                continue
+            known = [key for key_kind, key in keys if key_kind == kind]
+            if known and max(difflib.SequenceMatcher(None, name, key).ratio() for key in known) < self.cutoff:
+                return True
+        return False
+
+    def _fuzzy(self, kind: str, key: str) -> Set[str]:
+        if not key or self.cutoff >= 1:
+            return set()
+        close = difflib.get_close_matches(key, self._by[kind].keys(), n=1, cutoff=self.cutoff)
+        return set(self._by[kind][close[0]]) if close else set()
+
+    def resolve(self, emoji: Optional[str] = None, common_name: Optional[str] = None,
+                scientific_name: Optional[str] = None) -> Optional[str]:
+        """Id of the single life record the row describes, or None if it is unknown or ambiguous."""
+        self._ensure_loaded()
+        e, c, s = emoji_key(emoji), name_key(common_name), name_key(scientific_name)
+        with self._lock:
+            by_emoji = self._by['emoji'].get(e, set())
+            by_common = self._by['common'].get(c, set())
+            by_scientific = self._by['scientific'].get(s, set())
+            candidates = [
+                ('common', by_common),
+                ('scientific_emoji', by_scientific & by_emoji),
+                ('scientific', by_scientific),
+                ('fuzzy_common', None),
+                ('emoji', by_emoji),
+                ('fuzzy_scientific', None),
+            ]
+            for method, ids in candidates:
+                if ids is None:
+                    ids = self._fuzzy(method.split('_', 1)[1], c if method == 'fuzzy_common' else s)
+                    if len(ids) > 1 and by_emoji & ids:
+                        ids = by_emoji & ids
+                elif method == 'emoji':
+                    # A shared emoji alone does not make a clownfish a guppy
+                    ids = {life_id for life_id in ids if not self._contradicts(life_id, c, s)}
+                if len(ids) == 1:
+                    self.matches[method] = self.matches.get(method, 0) + 1
+                    return next(iter(ids))
+            self.misses += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"life": len(self._keys), "matches": dict(self.matches), "misses": self.misses}
+
+life_index = LifeIndex()
@@ -8,6 +8,7 @@ from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Request
 from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from contextlib import contextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -15,15 +16,18 @@ from apscheduler.triggers.interval import IntervalTrigger
 from functools import lru_cache
 import json
 import asyncio
+import time
 
 from .robot import RobotClient
 from .models import (
-    get_db, Image, Reading, AquariumStatus,
-    DBImage, DBReading, DBAIAnalysis, DBLife, LifeBase, Life,
-    RobotCommand, Trajectory, ScanState, AIAnalysis
+    get_db, get_read_db, get_read_session, Image, Reading, AquariumStatus,
+    DBImage, DBReading, DBAIAnalysis, DBLife, DBLifeSighting, LifeBase, Life, LifeSighting,
+    RobotCommand, Trajectory, ScanState, AIAnalysis, AnalysisJob
 )
 from .camera import CameraManager
-from .ai import ENABLED_MODELS, async_inference
+from .ai import AI_ANALYSES_MAP, ENABLED_MODELS, async_inference, is_error_response
+from .jobs import QueueFullError, job_queue
+from .life_index import life_index
 
 # Configure logging
 logging.basicConfig(
@@ -69,8 +73,12 @@ from pyaquarius.models import (
     RobotCommand
 )
 
-from .ai import ENABLED_MODELS
-from .camera import CameraManager, CAMERA_IMG_TYPE, CAMERA_MAX_DIM
+from .ai import ENABLED_MODELS, close_clients
+from .ai_cache import response_cache
+from . import ai_breaker, ai_image, ai_scheduler
+from .ai_uploads import gemini_uploads
+from .ai_scheduler import PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED
+from .camera import CameraManager, CAMERA_IMG_TYPE, CAMERA_MAX_DIM, STREAM_PROFILES, fingerprint_distance, select_profile
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
@@ -93,6 +101,12 @@ SCAN_INTERVAL = int(os.getenv('SCAN_INTERVAL', '10'))
 SCAN_ENABLED = os.getenv('SCAN_ENABLED', 'false').lower() == 'true'
 SCAN_TRAJECTORIES = os.getenv('SCAN_TRAJECTORIES', 'a,b,c,d').split(',')
 SCAN_SLEEP_TIME = int(os.getenv('SCAN_SLEEP_TIME', '4'))
+SCAN_BURST_FRAMES = int(os.getenv('SCAN_BURST_FRAMES', '5'))  # Frames per scan capture, the sharpest one is kept
+SCAN_MIN_SHARPNESS = float(os.getenv('SCAN_MIN_SHARPNESS', '0'))  # Skip analysis of captures below this sharpness, 0 disables
+SCAN_CHANGE_THRESHOLD = int(os.getenv('SCAN_CHANGE_THRESHOLD', '12'))  # Fingerprint bits that must differ to re-analyze, 0 disables
+SCAN_REUSE_MAX_AGE = int(os.getenv('SCAN_REUSE_MAX_AGE', '3600'))  # Seconds an analysis may be reused for unchanged captures
+LIFE_RECENT_SIGHTINGS = int(os.getenv('LIFE_RECENT_SIGHTINGS', '5'))  # Latest sightings returned per life record by /life
+SCAN_TEMPERATURE_FIRST_WINS = os.getenv('SCAN_TEMPERATURE_FIRST_WINS', 'true').lower() == 'true'  # Keep the first valid temperature instead of waiting for every model
 
 scheduler: Optional[AsyncIOScheduler] = None
 
@@ -102,7 +116,8 @@ async def scheduled_scan():
     try:
         await robot_scan(
             device_index=SCAN_CAMERA_ID,
-            trajectories=SCAN_TRAJECTORIES
+            trajectories=SCAN_TRAJECTORIES,
+            scheduled=True
         )
     except Exception as e:
         log.error(f"Scheduled scan failed: {e}")
@@ -125,6 +140,10 @@ async def startup_event():
     """Initialize camera manager and scheduler on startup."""
     global scheduler
     await camera_manager.initialize()
+    await asyncio.to_thread(life_index.load)
+    await job_queue.start()
+    if 'gemini' in ENABLED_MODELS:
+        gemini_uploads.start()
     
     scheduler = AsyncIOScheduler()
     if SCAN_ENABLED:
@@ -137,6 +156,13 @@ async def startup_event():
         )
         scheduler.start()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop analysis workers and close pooled AI provider connections on shutdown."""
+    await job_queue.stop()
+    await gemini_uploads.stop()
+    await close_clients()
+
 @app.get("/devices")
 async def get_devices():
     """List available camera devices."""
@@ -149,13 +175,44 @@ async def get_devices():
         "active": device.is_active
     } for device in camera_manager.devices.values()]
 
+@app.get("/camera/profiles")
+async def get_stream_profiles():
+    """List the stream profiles clients can select."""
+    return [{
+        "name": profile.name,
+        "max_dim": profile.max_dim,
+        "fps": profile.fps,
+        "quality": profile.quality
+    } for profile in STREAM_PROFILES]
+
+@app.get("/camera/metrics")
+async def get_camera_metrics():
+    """Per-device pipeline metrics: stage latency histograms, achieved FPS, drops and subscribers."""
+    return {
+        "timestamp": time.time(),
+        "devices": {index: device.metrics() for index, device in camera_manager.devices.items()}
+    }
+
 @app.get("/camera/{device_index}/stream")
-async def stream_camera(device_index: int, request: Request):
+async def stream_camera(
+    device_index: int,
+    request: Request,
+    profile: Optional[str] = None,
+    w: Optional[int] = None,
+    fps: Optional[int] = None,
+    q: Optional[int] = None
+):
+    """MJPEG stream using a named profile, or the best profile within the `w`/`fps`/`q` limits."""
     device = camera_manager.get_device(device_index)
     if not device:
         log.error(f"No camera found with index {device_index}")
         raise HTTPException(status_code=404, detail=f"Camera {device_index} not found")
     
+    try:
+        stream_profile = select_profile(profile, width=w, fps=fps, quality=q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     headers = {
         'Cache-Control': 'no-cache, no-store, must-revalidate',
         'Pragma': 'no-cache',
@@ -163,8 +220,6 @@ async def stream_camera(device_index: int, request: Request):
         'Connection': 'close',
     }
     
-    await device.start_stream()
-    
     async def cleanup(generator):
         try:
             async for frame in generator:
@@ -175,16 +230,71 @@ async def stream_camera(device_index: int, request: Request):
         except Exception as e:
             log.error(f"Stream error: {str(e)}", exc_info=True)
         finally:
-            await device.stop_stream()
+            # Only this client's subscription ends here, the shared grabber
+            # keeps serving other viewers until the last one disconnects
+            await generator.aclose()
     
     return StreamingResponse(
-        cleanup(camera_manager.generate_frames(device)),
+        cleanup(camera_manager.generate_frames(device, stream_profile)),
         media_type='multipart/x-mixed-replace; boundary=frame',
         headers=headers
     )
 
+@app.post("/capture/all")
+async def capture_all(after: Optional[float] = None):
+    """Capture from every active camera at once, stored under a shared capture group."""
+    devices = [device for device in camera_manager.devices.values() if device.is_active]
+    if not devices:
+        raise HTTPException(status_code=400, detail="No active cameras")
+
+    capture_group = datetime.now(timezone.utc).isoformat()
+    image_ids = {device.index: f"{capture_group}_{device.index}" for device in devices}
+    filenames = {index: f"{image_id}.{CAMERA_IMG_TYPE}" for index, image_id in image_ids.items()}
+
+    try:
+        log.debug(f"Initiating synchronized capture {capture_group} on devices {list(image_ids)}")
+        results = await camera_manager.capture_all(filenames, after=after)
+
+        images = []
+        errors = {}
+        timestamp = datetime.now(timezone.utc)
+        with get_db_session() as db:
+            for device_index, result in results.items():
+                if not result:
+                    errors[device_index] = f"Failed to capture from camera {device_index}"
+                    continue
+                filepath, width, height, file_size, sharpness, fingerprint = result
+                db.add(DBImage(
+                    id=image_ids[device_index],
+                    filepath=filepath,
+                    width=width,
+                    height=height,
+                    file_size=file_size,
+                    sharpness=sharpness,
+                    fingerprint=fingerprint,
+                    timestamp=timestamp,
+                    device_index=device_index,
+                    capture_group=capture_group
+                ))
+                images.append({"device_index": device_index, "image_id": image_ids[device_index], "filepath": filepath, "sharpness": sharpness})
+        log.info(f"Synchronized capture {capture_group} - {len(images)} saved, {len(errors)} failed")
+
+        if not images:
+            raise HTTPException(status_code=500, detail="Failed to capture from any camera")
+        return {"capture_group": capture_group, "images": images, "errors": errors}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error(f"Synchronized capture error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/capture/{device_index}")
-async def capture_image(device_index: int):
+async def capture_image(device_index: int, after: Optional[float] = None, burst: int = 1, trajectory: Optional[str] = None):
+    """Capture from the device's frame ring buffer, optionally the first frame at or after `after` (epoch seconds).
+
+    With `burst` > 1 the sharpest of that many consecutive frames is kept.
+    """
     log.debug(f"Capture request received for device {device_index}")
     device = camera_manager.get_device(device_index)
     if not device:
@@ -196,21 +306,17 @@ async def capture_image(device_index: int):
         raise HTTPException(status_code=400, detail=f"Camera {device_index} is not active")
     
     try:
-        was_streaming = device.is_streaming
-        log.debug(f"Stopping stream on device {device_index}")
-        await device.stop_stream()
-        
         # Generate filename first
         image_id = datetime.now(timezone.utc).isoformat()
         filename = f"{image_id}.{CAMERA_IMG_TYPE}"
         
         log.debug(f"Initiating capture on device {device_index}")
-        result = await camera_manager.capture_image(device, filename)
+        result = await camera_manager.capture_image(device, filename, after=after, burst=burst)
         if not result:
             log.error(f"Capture failed for device {device_index}")
             raise HTTPException(status_code=500, detail=f"Failed to capture from camera {device_index}")
             
-        filepath, width, height, file_size = result
+        filepath, width, height, file_size, sharpness, fingerprint = result
         log.debug(f"Capture successful - saving to database. Path: {filepath}")
         
         with get_db_session() as db:
@@ -220,26 +326,25 @@ async def capture_image(device_index: int):
                 width=width,
                 height=height,
                 file_size=file_size,
+                sharpness=sharpness,
+                fingerprint=fingerprint,
+                trajectory=trajectory,
                 timestamp=datetime.now(timezone.utc),
                 device_index=device_index
             )
             db.add(image)
             log.debug(f"Image record created in database with id {image.id}")
-        
-        if was_streaming:
-            log.debug(f"Restarting stream for device {device_index}")
-            await device.start_stream()
             
-        return {"filepath": filepath, "image_id": image_id}
+        return {"filepath": filepath, "image_id": image_id, "sharpness": sharpness, "fingerprint": fingerprint}
         
+    except HTTPException:
+        raise
     except Exception as e:
         log.error(f"Capture error: {str(e)}", exc_info=True)
-        if was_streaming:
-            await device.start_stream()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/analyze/{ai_models}/{analyses}")
-async def analyze(ai_models: str, analyses: str, image_id: Optional[str] = None):
+async def analyze(ai_models: str, analyses: str, image_id: Optional[str] = None, first_wins: bool = False):
     ai_models_list = ai_models.split(',')
     analyses_list = analyses.split(',')
     
@@ -251,7 +356,8 @@ async def analyze(ai_models: str, analyses: str, image_id: Optional[str] = None)
             log.error(f"Invalid AI models requested: {invalid_models}")
             raise HTTPException(status_code=400, detail=f"Invalid AI models: {', '.join(invalid_models)}")
             
-        with get_db_session() as db:
+        # Closed before inference so no connection is held while the models run
+        with get_read_session() as db:
             if image_id:
                 log.debug(f"Querying image with id {image_id}")
                 latest_image = db.query(DBImage).filter(DBImage.id == image_id).first()
@@ -262,37 +368,40 @@ async def analyze(ai_models: str, analyses: str, image_id: Optional[str] = None)
                 latest_image = db.query(DBImage).order_by(DBImage.timestamp.desc()).first()
                 if not latest_image:
                     raise HTTPException(status_code=404, detail="No images available")
+            latest_image_id, latest_image_filepath = latest_image.id, latest_image.filepath
             
-            log.debug(f"Using image {latest_image.id} for analysis")
-            # TODO: pass in tank_id, as the first character of image_id
-            ai_responses = await async_inference(ai_models_list, analyses_list, latest_image.filepath, tank_id=0)
-            
-            log.debug("Processing AI responses")
-            responses_with_errors = {
-                key: {
-                    'success': not isinstance(resp, Exception),
-                    'result': str(resp) if not isinstance(resp, Exception) else None,
-                    'error': str(resp) if isinstance(resp, Exception) else None
-                }
-                for key, resp in ai_responses.items()
+        log.debug(f"Using image {latest_image_id} for analysis")
+        # TODO: pass in tank_id, as the first character of image_id
+        ai_responses = await async_inference(
+            ai_models_list, analyses_list, latest_image_filepath, tank_id=0, image_id=latest_image_id, first_wins=first_wins
+        )
+        
+        log.debug("Processing AI responses")
+        responses_with_errors = {
+            key: {
+                'success': not isinstance(resp, Exception),
+                'result': str(resp) if not isinstance(resp, Exception) else None,
+                'error': str(resp) if isinstance(resp, Exception) else None
             }
-            
-            successful = sum(1 for resp in responses_with_errors.values() if resp['success'])
-            failed = sum(1 for resp in responses_with_errors.values() if not resp['success'])
-            log.info(f"Analysis complete - {successful} successful, {failed} failed")
-            
-            return {
-                "analysis": {
-                    key: resp['result'] 
-                    for key, resp in responses_with_errors.items() 
-                    if resp['success']
-                },
-                "errors": {
-                    key: resp['error']
-                    for key, resp in responses_with_errors.items()
-                    if not resp['success']
-                }
+            for key, resp in ai_responses.items()
+        }
+        
+        successful = sum(1 for resp in responses_with_errors.values() if resp['success'])
+        failed = sum(1 for resp in responses_with_errors.values() if not resp['success'])
+        log.info(f"Analysis complete - {successful} successful, {failed} failed")
+        
+        return {
+            "analysis": {
+                key: resp['result'] 
+                for key, resp in responses_with_errors.items() 
+                if resp['success']
+            },
+            "errors": {
+                key: resp['error']
+                for key, resp in responses_with_errors.items()
+                if not resp['success']
             }
+        }
             
     except HTTPException:
         raise
@@ -300,12 +409,73 @@ async def analyze(ai_models: str, analyses: str, image_id: Optional[str] = None)
         log.error(f"Analysis error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+def trajectory_tank_id(trajectory: Optional[str]) -> int:
+    """Tank a trajectory belongs to, from the first character of its name."""
+    return int(trajectory[0]) if trajectory and trajectory[0].isdigit() else 0
+
+@app.post("/jobs/analyze/{ai_models}/{analyses}")
+async def enqueue_analysis(ai_models: str, analyses: str, image_id: Optional[str] = None, tank_id: Optional[int] = None,
+                           callback_url: Optional[str] = None) -> AnalysisJob:
+    """Queue an analysis and return its job right away, poll GET /jobs/{job_id} for the result."""
+    ai_models_list = ai_models.split(',')
+    analyses_list = analyses.split(',')
+    invalid_models = [m for m in ai_models_list if m not in ENABLED_MODELS]
+    if invalid_models:
+        raise HTTPException(status_code=400, detail=f"Invalid AI models: {', '.join(invalid_models)}")
+    invalid_analyses = [a for a in analyses_list if a not in AI_ANALYSES_MAP]
+    if invalid_analyses:
+        raise HTTPException(status_code=400, detail=f"Invalid analyses: {', '.join(invalid_analyses)}")
+
+    with get_read_session() as db:
+        if image_id:
+            image = db.query(DBImage).filter(DBImage.id == image_id).first()
+            if not image:
+                raise HTTPException(status_code=404, detail=f"Image {image_id} not found")
+        else:
+            image = db.query(DBImage).order_by(DBImage.timestamp.desc()).first()
+            if not image:
+                raise HTTPException(status_code=404, detail="No images available")
+        image_id = image.id
+        if tank_id is None:
+            tank_id = trajectory_tank_id(image.trajectory)
+
+    try:
+        return job_queue.enqueue(ai_models_list, analyses_list, image_id, tank_id=tank_id, callback_url=callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 20) -> List[AnalysisJob]:
+    return job_queue.recent(status=status, limit=limit)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> AnalysisJob:
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/ai/metrics")
+async def get_ai_metrics():
+    """AI response cache, upload preprocessing and per-provider queue metrics."""
+    return {
+        "cache": response_cache.stats(),
+        "images": ai_image.stats(),
+        "providers": ai_scheduler.metrics(),
+        "breakers": ai_breaker.status(),
+        "jobs": job_queue.metrics(),
+        "gemini_uploads": gemini_uploads.stats(),
+        "life_index": life_index.stats(),
+    }
+
 @app.get("/healthcheck")
 async def health_check():
     return {"status": "ok"}
 
 @app.get("/status")
-async def get_status(db: Session = Depends(get_db)) -> AquariumStatus:
+async def get_status(db: Session = Depends(get_read_db)) -> AquariumStatus:
     latest_images = {}
     for device in camera_manager.devices.values():
         latest_image = db.query(DBImage)\
@@ -328,25 +498,60 @@ async def get_status(db: Session = Depends(get_db)) -> AquariumStatus:
         alerts=list(set(alerts)),
         timezone=TIMEZONE,
         location=LOCATION,
-        scan_enabled=SCAN_ENABLED
+        scan_enabled=SCAN_ENABLED,
+        ai_providers={ai_model: ai_breaker.get_breaker(ai_model).status() for ai_model in ENABLED_MODELS}
     )
 
 @app.get("/images")
-async def list_images(limit: int = 10, offset: int = 0, db: Session = Depends(get_db)) -> List[Image]:
+async def list_images(limit: int = 10, offset: int = 0, db: Session = Depends(get_read_db)) -> List[Image]:
     images = db.query(DBImage).order_by(DBImage.timestamp.desc()).offset(offset).limit(limit).all()
     return [Image.from_orm(img) for img in images]
 
 @app.get("/readings/history")
-async def get_readings_history(hours: int = 24, db: Session = Depends(get_db)) -> List[Reading]:
+async def get_readings_history(hours: int = 24, db: Session = Depends(get_read_db)) -> List[Reading]:
     since = datetime.now(timezone.utc) - timedelta(hours=hours)
     readings = db.query(DBReading).filter(DBReading.timestamp >= since).order_by(DBReading.timestamp.asc()).all()
     return [Reading.from_orm(r) for r in readings]
 
+def life_with_sightings(db: Session, lives: List[DBLife], recent: int = LIFE_RECENT_SIGHTINGS) -> List[Life]:
+    """Life records with their sighting counts and latest sightings, in two queries regardless of history size."""
+    life_ids = [l.id for l in lives]
+    if not life_ids:
+        return []
+    counts = dict(db.query(DBLifeSighting.life_id, func.count(DBLifeSighting.id))
+                  .filter(DBLifeSighting.life_id.in_(life_ids))
+                  .group_by(DBLifeSighting.life_id)
+                  .all())
+    sightings: Dict[str, List[LifeSighting]] = {life_id: [] for life_id in life_ids}
+    if recent > 0:
+        ranked = db.query(
+            DBLifeSighting.life_id,
+            DBLifeSighting.image_id,
+            DBLifeSighting.ai_model,
+            DBLifeSighting.timestamp,
+            func.row_number().over(partition_by=DBLifeSighting.life_id, order_by=DBLifeSighting.timestamp.desc()).label('rank')
+        ).filter(DBLifeSighting.life_id.in_(life_ids)).subquery()
+        rows = db.query(ranked).filter(ranked.c.rank <= recent).order_by(ranked.c.timestamp.desc()).all()
+        for row in rows:
+            sightings[row.life_id].append(LifeSighting(image_id=row.image_id, ai_model=row.ai_model, timestamp=row.timestamp))
+    return [
+        Life(
+            id=l.id,
+            emoji=l.emoji,
+            common_name=l.common_name,
+            scientific_name=l.scientific_name,
+            last_seen_at=l.last_seen_at,
+            sighting_count=counts.get(l.id, 0),
+            recent_sightings=sightings[l.id],
+        )
+        for l in lives
+    ]
+
 @app.get("/life")
-async def get_life(db: Session = Depends(get_db)) -> List[Life]:
-    """Get all life in the aquarium."""
+async def get_life(db: Session = Depends(get_read_db)) -> List[Life]:
+    """Get all life in the aquarium with sighting counts and the latest sightings."""
     life = db.query(DBLife).order_by(DBLife.last_seen_at.desc()).all()
-    return [Life.from_orm(l) for l in life]
+    return life_with_sightings(db, life)
 
 @app.post("/life")
 async def add_life(life: LifeBase, db: Session = Depends(get_db)) -> Life:
@@ -357,7 +562,8 @@ async def add_life(life: LifeBase, db: Session = Depends(get_db)) -> Life:
     )
     db.add(db_life)
     db.commit()
-    return Life.from_orm(db_life)
+    life_index.upsert(db_life)
+    return life_with_sightings(db, [db_life])[0]
 
 @app.put("/life/{life_id}")
 async def update_life(life_id: str, life: LifeBase, db: Session = Depends(get_db)) -> Life:
@@ -369,7 +575,8 @@ async def update_life(life_id: str, life: LifeBase, db: Session = Depends(get_db
         setattr(db_life, key, value)
     db_life.last_seen_at = datetime.now(timezone.utc)
     db.commit()
-    return Life.from_orm(db_life)
+    life_index.upsert(db_life)
+    return life_with_sightings(db, [db_life])[0]
 
 @app.post("/robot/command")
 async def send_command(command: RobotCommand) -> Dict[str, str]:
@@ -419,24 +626,68 @@ async def delete_trajectory(name: str) -> Dict[str, str]:
         log.error(f"Failed to delete trajectory {name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def reuse_unchanged_analysis(trajectory: str, image_id: str, fingerprint: str) -> Optional[Dict[str, str]]:
+    """Reuse the last analysis of this trajectory if the new capture has not changed meaningfully.
+
+    Compares against the latest image on the trajectory with a successful analysis, records
+    the decision on the new image and returns the previous responses keyed like async_inference.
+    Nothing is reused if any analysis of that image failed, or its temperature gave no reading.
+    """
+    if SCAN_CHANGE_THRESHOLD <= 0 or not fingerprint:
+        return None
+    with get_db_session() as db:
+        previous = db.query(DBImage)\
+            .join(DBAIAnalysis, DBAIAnalysis.image_id == DBImage.id)\
+            .filter(DBImage.trajectory == trajectory, DBImage.id != image_id, DBImage.fingerprint.isnot(None))\
+            .filter(~DBAIAnalysis.response.like('% API error: %'), ~DBAIAnalysis.response.like('Database error%'))\
+            .order_by(DBImage.timestamp.desc())\
+            .first()
+        if not previous:
+            return None
+
+        age = (datetime.utcnow() - previous.timestamp.replace(tzinfo=None)).total_seconds()
+        distance = fingerprint_distance(fingerprint, previous.fingerprint)
+        if distance >= SCAN_CHANGE_THRESHOLD or age > SCAN_REUSE_MAX_AGE:
+            log.debug(f"Capture {image_id} changed since {previous.id} ({distance} bits, {age:.0f}s old), analyzing")
+            return None
+
+        analyses = db.query(DBAIAnalysis).filter(DBAIAnalysis.image_id == previous.id).all()
+        if any(is_error_response(analysis.response) for analysis in analyses):
+            log.debug(f"Capture {image_id} unchanged since {previous.id} but an analysis of it failed, analyzing")
+            return None
+        if any(analysis.analysis == 'estimate_temperature' for analysis in analyses) and \
+                not db.query(DBReading.id).filter(DBReading.image_id == previous.id).first():
+            log.debug(f"Capture {image_id} unchanged since {previous.id} but it gave no temperature reading, analyzing")
+            return None
+        db.query(DBImage).filter(DBImage.id == image_id).update({DBImage.reused_analysis_from: previous.id})
+        log.info(f"Capture {image_id} unchanged since {previous.id} ({distance} bits), reusing its analysis")
+        return {f"{analysis.ai_model}.{analysis.analysis}": analysis.response for analysis in analyses}
+
 @app.post("/robot/scan")
 async def robot_scan(
     device_index: int,
     trajectories: List[str],
+    scheduled: bool = False,
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """Execute robot trajectories while capturing and analyzing images."""
+    # Scheduled scans yield provider slots to interactive analyses
+    priority = PRIORITY_SCHEDULED if scheduled else PRIORITY_INTERACTIVE
     results = []
+    device = camera_manager.get_device(device_index)
     try:
         for trajectory in trajectories:
+            if device:
+                # Fill the ring buffer while the arm moves so capture does not wait on a cold read
+                device.grabber.keep_warm()
             robot_client.send_command('p', trajectory)
             await asyncio.sleep(SCAN_SLEEP_TIME)
+            settled_at = time.time()
             
-            # Get tank_id from first character of trajectory name
-            tank_id = int(trajectory[0]) if trajectory[0].isdigit() else 0
+            tank_id = trajectory_tank_id(trajectory)
             
-            # Capture image and get image_id
-            capture_result = await capture_image(device_index)
+            # Capture first frame after the arm settled and get image_id
+            capture_result = await capture_image(device_index, after=settled_at, burst=SCAN_BURST_FRAMES, trajectory=trajectory)
             image_id = capture_result.get('image_id')
             
             robot_client.send_command('h')  # return home
@@ -444,6 +695,28 @@ async def robot_scan(
             if not image_id:
                 log.error(f"No image_id returned from capture for trajectory {trajectory}")
                 continue
+
+            if capture_result['sharpness'] < SCAN_MIN_SHARPNESS:
+                log.warning(f"Skipping analysis of blurry capture {image_id} for trajectory {trajectory} (sharpness {capture_result['sharpness']:.1f})")
+                results.append({
+                    'trajectory': trajectory,
+                    'image_id': image_id,
+                    'filepath': capture_result['filepath'],
+                    'analysis': {},
+                    'skipped': 'blurry'
+                })
+                continue
+
+            reused = reuse_unchanged_analysis(trajectory, image_id, capture_result['fingerprint'])
+            if reused is not None:
+                results.append({
+                    'trajectory': trajectory,
+                    'image_id': image_id,
+                    'filepath': capture_result['filepath'],
+                    'analysis': reused,
+                    'skipped': 'unchanged'
+                })
+                continue
                 
             if 'temp' in trajectory:
                 ai_responses = await async_inference(
@@ -451,7 +724,9 @@ async def robot_scan(
                     ['estimate_temperature'],
                     capture_result['filepath'],
                     tank_id=tank_id,
-                    image_id=image_id
+                    image_id=image_id,
+                    priority=priority,
+                    first_wins=SCAN_TEMPERATURE_FIRST_WINS
                 )
             else:
                 ai_responses = await async_inference(
@@ -459,7 +734,8 @@ async def robot_scan(
                     ['identify_life'],
                     capture_result['filepath'],
                     tank_id=tank_id,
-                    image_id=image_id
+                    image_id=image_id,
+                    priority=priority
                 )
                 
             results.append({
@@ -508,7 +784,7 @@ async def toggle_scan(state: ScanState) -> Dict[str, bool]:
 
 @app.get("/analyses")
 async def get_analyses(limit: int = 5):
-    with get_db_session() as db:
+    with get_read_session() as db:
         analyses = (db.query(DBAIAnalysis)
                    .order_by(DBAIAnalysis.timestamp.desc())
                    .limit(limit)
@@ -0,0 +1,43 @@
+"""Rolling latency statistics shared by the camera pipeline and the AI scheduler."""
+from collections import deque
+from typing import Any, Dict
+
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+class RollingStats:
+    """Rolling window of recent durations, for example of one camera pipeline stage."""
+    __slots__ = ('samples', 'count', 'buckets_ms')
+
+    def __init__(self, size: int = 300, buckets_ms: tuple = DEFAULT_BUCKETS_MS):
+        self.samples: deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.buckets_ms = buckets_ms
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds * 1000)
+        self.count += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Percentiles in ms and a cumulative histogram over buckets_ms for the window."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": self.count, "window": 0}
+        def pct(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+        buckets = {}
+        position = 0
+        for edge in self.buckets_ms:
+            while position < len(ordered) and ordered[position] <= edge:
+                position += 1
+            buckets[f"le_{edge}"] = position
+        buckets["le_inf"] = len(ordered)
+        return {
+            "count": self.count,
+            "window": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered), 3),
+            "p50_ms": pct(0.50),
+            "p90_ms": pct(0.90),
+            "p99_ms": pct(0.99),
+            "max_ms": round(ordered[-1], 3),
+            "buckets": buckets,
+        }
@@ -3,16 +3,18 @@ import logging
 import os
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from contextlib import contextmanager
 import json
 import re
 
 from pydantic import BaseModel, Field, validator, constr
-from sqlalchemy import Column, DateTime, Float, Index, Integer, String, create_engine
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, String, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+
+from pyaquarius.db import create_engines
 
 # Directory settings
 DATA_DIR = os.getenv('DATA_DIR', 'data')
@@ -29,14 +31,9 @@ for dir in [DATA_DIR, IMAGES_DIR, DATABASE_DIR]:
     if not os.path.exists(dir):
         os.makedirs(dir, exist_ok=True)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10
-)
+engine, read_engine = create_engines(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
 class BaseMixin:
@@ -53,6 +50,11 @@ class DBImage(BaseMixin, Base):
     width = Column(Integer)
     height = Column(Integer)
     file_size = Column(Integer)
+    capture_group = Column(String, nullable=True)  # Shared by images from one synchronized multi-camera capture
+    sharpness = Column(Float, nullable=True)  # Laplacian variance, higher is sharper
+    fingerprint = Column(String, nullable=True)  # Difference hash used for change detection
+    trajectory = Column(String, nullable=True)  # Robot trajectory the image was captured on
+    reused_analysis_from = Column(String, nullable=True)  # Image whose analysis was reused because nothing changed
 
 class DBReading(BaseMixin, Base):
     __tablename__ = "readings"
@@ -72,6 +74,40 @@ class DBAIAnalysis(BaseMixin, Base):
     ai_model = Column(String)
     analysis = Column(String)
     response = Column(String)
+    cached = Column(Boolean, default=False)  # Response served from the AI response cache
+
+class DBAICacheEntry(Base):
+    __tablename__ = "ai_cache"
+    key = Column(String, primary_key=True)  # sha256 of model, prompt and image content
+    ai_model = Column(String)
+    response = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+class DBGeminiUpload(Base):
+    __tablename__ = "gemini_uploads"
+    digest = Column(String, primary_key=True)  # sha256 of the uploaded bytes
+    name = Column(String, nullable=False)  # Remote file name, used to delete it
+    uri = Column(String, nullable=False)
+    mime_type = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)  # Reused until then, deleted remotely after
+
+class DBAnalysisJob(BaseMixin, Base):
+    __tablename__ = "analysis_jobs"
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default='queued')  # queued, running, done or failed
+    ai_models = Column(String, nullable=False)  # Comma separated
+    analyses = Column(String, nullable=False)  # Comma separated
+    image_id = Column(String, nullable=False)
+    tank_id = Column(Integer, default=0)
+    priority = Column(Integer, default=0)
+    callback_url = Column(String, nullable=True)  # Receives the job as JSON when it finishes
+    attempts = Column(Integer, default=0)
+    result = Column(String, nullable=True)  # JSON object of responses keyed model.analysis
+    error = Column(String, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
 
 class AIAnalysisBase(BaseModel):
     image_id: str
@@ -83,9 +119,38 @@ class AIAnalysisBase(BaseModel):
 class AIAnalysis(AIAnalysisBase):
     id: str = Field(default_factory=lambda: datetime.now().isoformat())
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    cached: Optional[bool] = False
+    class Config:
+        from_attributes = True
+
+class AnalysisJob(BaseModel):
+    id: str
+    status: str
+    ai_models: List[str]
+    analyses: List[str]
+    image_id: str
+    tank_id: int = 0
+    attempts: int = 0
+    result: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     class Config:
         from_attributes = True
 
+    @validator('ai_models', 'analyses', pre=True)
+    def split_list(cls, v):
+        if isinstance(v, str):
+            return [item for item in v.split(',') if item]
+        return v
+
+    @validator('result', pre=True)
+    def parse_result(cls, v):
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
 class ImageBase(BaseModel):
     filepath: str
     width: int
@@ -95,6 +160,11 @@ class ImageBase(BaseModel):
 class Image(ImageBase):
     id: str = Field(default_factory=lambda: datetime.now().isoformat())
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    device_index: Optional[int] = None
+    capture_group: Optional[str] = None
+    sharpness: Optional[float] = None
+    trajectory: Optional[str] = None
+    reused_analysis_from: Optional[str] = None
     class Config:
         from_attributes = True
 
@@ -129,7 +199,15 @@ class DBLife(BaseMixin, Base):
     common_name = Column(String)
     emoji = Column(String)
     last_seen_at = Column(DateTime, default=datetime.utcnow)
-    image_refs = Column(String, default='[]')  # JSON string array of image IDs
+    image_refs = Column(String, default='[]')  # Legacy JSON array of image IDs, migrated to life_sightings
+
+class DBLifeSighting(Base):
+    __tablename__ = "life_sightings"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    life_id = Column(String, nullable=False)
+    image_id = Column(String, nullable=False)
+    ai_model = Column(String, nullable=False, default='')  # Empty for sightings migrated from image_refs
+    timestamp = Column(DateTime, default=datetime.utcnow)
 
 class LifeBase(BaseModel):
     scientific_name: str
@@ -143,6 +221,7 @@ class AquariumStatus(BaseModel):
     timezone: str
     location: str
     scan_enabled: bool = False
+    ai_providers: Dict[str, Dict[str, Any]] = Field(default_factory=dict)  # Circuit breaker state per AI provider
 
 class Trajectory(BaseModel):
     name: str
@@ -188,10 +267,70 @@ def load_life_from_csv(db: Session) -> None:
         log.error(f"Failed to load life data: {str(e)}")
         raise
 
-Base.metadata.create_all(bind=engine)
 Index('idx_readings_timestamp', DBReading.timestamp)
 Index('idx_images_timestamp', DBImage.timestamp)
+Index('idx_images_filepath', DBImage.filepath)
+Index('idx_images_capture_group', DBImage.capture_group)
+Index('idx_images_trajectory', DBImage.trajectory)
+Index('idx_ai_responses_image_id', DBAIAnalysis.image_id)
 Index('idx_life_last_seen_at', DBLife.last_seen_at)
+Index('idx_life_sightings_unique', DBLifeSighting.life_id, DBLifeSighting.image_id, DBLifeSighting.ai_model, unique=True)
+Index('idx_life_sightings_life_timestamp', DBLifeSighting.life_id, DBLifeSighting.timestamp)
+Index('idx_life_sightings_image_id', DBLifeSighting.image_id)
+Index('idx_ai_cache_last_used_at', DBAICacheEntry.last_used_at)
+Index('idx_gemini_uploads_expires_at', DBGeminiUpload.expires_at)
+Index('idx_analysis_jobs_status', DBAnalysisJob.status, DBAnalysisJob.created_at)
+Base.metadata.create_all(bind=engine)
+
+def migrate_schema() -> None:
+    """Add columns and indexes introduced after an existing database was created."""
+    log = logging.getLogger(__name__)
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    log.info(f"Added column {table.name}.{column.name}")
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def migrate_image_refs() -> None:
+    """Move sightings still stored in the legacy life.image_refs JSON arrays into life_sightings."""
+    log = logging.getLogger(__name__)
+    with SessionLocal() as db:
+        legacy = db.query(DBLife).filter(DBLife.image_refs.isnot(None), DBLife.image_refs != '[]').all()
+        if not legacy:
+            return
+        moved = 0
+        for life in legacy:
+            image_ids = json.loads(life.image_refs or '[]')
+            timestamps = dict(db.query(DBImage.id, DBImage.timestamp).filter(DBImage.id.in_(image_ids)).all())
+            if image_ids:
+                db.execute(sqlite_insert(DBLifeSighting).values([
+                    {"life_id": life.id, "image_id": image_id, "ai_model": '',
+                     "timestamp": timestamps.get(image_id) or life.last_seen_at}
+                    for image_id in image_ids
+                ]).on_conflict_do_nothing())
+                moved += len(image_ids)
+            life.image_refs = '[]'
+        db.commit()
+        log.info(f"Migrated {moved} sightings of {len(legacy)} life records from image_refs")
+
+def record_sightings(db: Session, life_ids: List[str], image_id: str, ai_model: str, timestamp: datetime) -> None:
+    """Insert one sighting per life id in a single statement, skipping ones already recorded."""
+    if not life_ids:
+        return
+    db.execute(sqlite_insert(DBLifeSighting).values([
+        {"life_id": life_id, "image_id": image_id, "ai_model": ai_model, "timestamp": timestamp}
+        for life_id in life_ids
+    ]).on_conflict_do_nothing())
+
+migrate_schema()
+migrate_image_refs()
 
 with SessionLocal() as db:
     load_life_from_csv(db)
@@ -216,16 +355,34 @@ def get_db_session():
     finally:
         session.close()
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@contextmanager
+def get_read_session():
+    """Session on the read-only pool, for queries that never write."""
+    session = ReadSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+class LifeSighting(BaseModel):
+    image_id: str
+    ai_model: str
+    timestamp: datetime
+    class Config:
+        from_attributes = True
+
 class Life(LifeBase):
     id: str = Field(default_factory=lambda: datetime.now().isoformat())
     last_seen_at: datetime = Field(default_factory=datetime.utcnow)
-    image_refs: List[str] = Field(default_factory=list)
+    sighting_count: int = 0
+    recent_sightings: List[LifeSighting] = Field(default_factory=list)
     
     class Config:
         from_attributes = True
-        
-    @validator('image_refs', pre=True)
-    def parse_image_refs(cls, v):
-        if isinstance(v, str):
-            return json.loads(v)
-        return v
@@ -0,0 +1,193 @@
+"""Hardware-free camera sources that stand in for cv2.VideoCapture.
+
+Each source implements the subset of the VideoCapture interface that
+CameraDevice uses (isOpened, read, set, get, release) and paces read() to its
+frame rate the way a real camera blocks until the next frame, so streaming,
+capture and scans behave as they do with hardware.
+
+Source specs, configured through CAMERA_SOURCES as `index=spec`:
+
+    synthetic:1280x720@30       generated test pattern with moving shapes
+    file:/data/tank.mp4@15      replay a video file in a loop
+    dir:/data/sample_images@5   loop over the images in a directory
+"""
+import abc
+import logging
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+SOURCE_KINDS = ('synthetic', 'file', 'dir')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def is_source_spec(path: str) -> bool:
+    """True if path names a software source rather than a device node."""
+    return path.split(':', 1)[0] in SOURCE_KINDS
+
+def parse_source_spec(spec: str) -> Tuple[str, str, Optional[float]]:
+    """Split `kind:target@fps` into its parts, target and fps are optional."""
+    kind, _, target = spec.partition(':')
+    if kind not in SOURCE_KINDS:
+        raise ValueError(f"Unknown camera source kind {kind}, expected one of {SOURCE_KINDS}")
+    fps = None
+    if '@' in target:
+        target, _, fps_str = target.rpartition('@')
+        fps = float(fps_str)
+    return kind, target, fps
+
+class PacedSource(abc.ABC):
+    """Base class handling pacing and the VideoCapture property interface."""
+
+    def __init__(self, width: int, height: int, fps: float, fixed_size: bool = False):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fixed_size = fixed_size  # Ignore size requests, like a camera with a single mode
+        self.frame_index = 0
+        self._opened = True
+        self._next_frame_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def set(self, prop: int, value: float) -> bool:
+        if self.fixed_size and prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT):
+            return False
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        elif prop == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+        else:
+            return False
+        return True
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def release(self) -> None:
+        self._opened = False
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Block until the next frame is due, then return it like VideoCapture.read."""
+        with self._lock:
+            if not self._opened:
+                return False, None
+            delay = self._next_frame_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # Do not try to catch up after a slow consumer, like a camera dropping frames
+            self._next_frame_at = max(self._next_frame_at, time.monotonic() - 1 / self.fps) + 1 / self.fps
+            frame = self._next_frame()
+            self.frame_index += 1
+        if frame is None:
+            return False, None
+        return True, frame
+
+    @abc.abstractmethod
+    def _next_frame(self) -> Optional[np.ndarray]:
+        """The next frame at the source's own size, or None once it is exhausted."""
+
+    def _fit(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        if (width, height) != (self.width, self.height):
+            frame = cv2.resize(frame, (self.width, self.height))
+        return frame
+
+class SyntheticSource(PacedSource):
+    """Deterministic test pattern: static gradient background with a moving disc and frame counter."""
+
+    def __init__(self, width: int, height: int, fps: float, fixed_size: bool = False):
+        super().__init__(width, height, fps, fixed_size)
+        self._background: Optional[np.ndarray] = None
+
+    def _make_background(self) -> np.ndarray:
+        x = np.linspace(0, 255, self.width, dtype=np.uint8)
+        y = np.linspace(0, 255, self.height, dtype=np.uint8)
+        background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        background[..., 0] = x[None, :]
+        background[..., 1] = y[:, None]
+        background[..., 2] = 96
+        return background
+
+    def _next_frame(self) -> np.ndarray:
+        if self._background is None or self._background.shape[:2] != (self.height, self.width):
+            self._background = self._make_background()
+        frame = self._background.copy()
+        radius = max(4, min(self.width, self.height) // 12)
+        period = max(1, int(self.fps * 4))
+        phase = (self.frame_index % period) / period
+        center = (int(radius + phase * (self.width - 2 * radius)), self.height // 2)
+        cv2.circle(frame, center, radius, (0, 165, 255), -1)
+        cv2.putText(frame, str(self.frame_index), (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+        return frame
+
+class VideoFileSource(PacedSource):
+    """Replays a video file in a loop at its own frame rate unless one is given."""
+
+    def __init__(self, path: str, width: int, height: int, fps: Optional[float] = None):
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise ValueError(f"Cannot open video file {path}")
+        file_fps = self._cap.get(cv2.CAP_PROP_FPS)
+        super().__init__(width, height, fps or file_fps or 30.0)
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        ret, frame = self._cap.read()
+        if not ret:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+            if not ret:
+                return None
+        return self._fit(frame)
+
+    def release(self) -> None:
+        super().release()
+        self._cap.release()
+
+class ImageDirectorySource(PacedSource):
+    """Loops over the images in a directory in name order, decoding each once."""
+
+    def __init__(self, path: str, width: int, height: int, fps: float):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not names:
+            raise ValueError(f"No images found in {path}")
+        super().__init__(width, height, fps)
+        self._images: List[np.ndarray] = []
+        for name in names:
+            image = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+            if image is not None:
+                self._images.append(image)
+        if not self._images:
+            raise ValueError(f"No readable images in {path}")
+
+    def _next_frame(self) -> np.ndarray:
+        return self._fit(self._images[self.frame_index % len(self._images)])
+
+def open_source(spec: str, width: int, height: int, fps: float) -> PacedSource:
+    """Open the source named by spec, `width`/`height`/`fps` are defaults the spec may override."""
+    kind, target, spec_fps = parse_source_spec(spec)
+    if kind == 'synthetic':
+        if target:
+            width, height = (int(v) for v in target.lower().split('x'))
+        source = SyntheticSource(width, height, spec_fps or fps, fixed_size=bool(target))
+    elif kind == 'file':
+        source = VideoFileSource(target, width, height, spec_fps)
+    else:
+        source = ImageDirectorySource(target, width, height, spec_fps or fps)
+    log.info(f"Opened {kind} camera source {target or ''} at {source.width}x{source.height} {source.fps:g}fps")
+    return source
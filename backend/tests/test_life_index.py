@@ -0,0 +1,68 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+# Keep pyaquarius.models from creating its database in the working directory
+_workdir = tempfile.mkdtemp()
+os.environ.setdefault('DATA_DIR', _workdir)
+os.environ.setdefault('IMAGES_DIR', os.path.join(_workdir, 'images'))
+os.environ.setdefault('DATABASE_DIR', os.path.join(_workdir, 'db'))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_workdir, 'db', 'test.db')}")
+
+from pyaquarius.life_index import LifeIndex  # noqa: E402
+
+
+@pytest.fixture
+def index(tmp_path):
+    catalog = tmp_path / "life.csv"
+    catalog.write_text(
+        "emoji,common_name,scientific_name\n"
+        "🐠,Fancy Guppy,Poecilia reticulata\n"
+        "🦈,Dumbo Halfmoon Betta,Betta splendens\n"
+        "🦈,Galaxy Joi Plakat Betta,Betta splendens\n"
+        "🐍,Kuhli Loach,Pangio kuhlii\n"
+    )
+    life = [
+        SimpleNamespace(id='guppy', emoji='🐠', common_name='Fancy Guppy', scientific_name='Poecilia reticulata'),
+        SimpleNamespace(id='dumbo', emoji='🦈', common_name='Dumbo Halfmoon Betta', scientific_name='Betta splendens'),
+        SimpleNamespace(id='galaxy', emoji='🦈', common_name='Galaxy Joi Plakat Betta', scientific_name='Betta splendens'),
+        SimpleNamespace(id='kuhli', emoji='🐍', common_name='Kuhli Loach', scientific_name='Pangio kuhlii'),
+    ]
+    index = LifeIndex(csv_path=str(catalog), cutoff=0.85)
+    index.load(life)
+    return index
+
+
+def test_exact_common_name(index):
+    assert index.resolve('🦈', 'Galaxy Joi Plakat Betta', 'Betta splendens') == 'galaxy'
+
+
+def test_emoji_variant_and_scientific_name(index):
+    assert index.resolve('🐠️', '', 'Poecilia reticulata') == 'guppy'
+
+
+def test_fuzzy_common_name(index):
+    assert index.resolve('🐍', 'Kuhli loachs', '') == 'kuhli'
+
+
+def test_shared_emoji_without_names_is_ambiguous(index):
+    assert index.resolve('🦈', '', 'Betta splendens') is None
+
+
+def test_emoji_alone(index):
+    assert index.resolve('🐠', '', '') == 'guppy'
+
+
+def test_emoji_with_contradicting_names_is_unknown(index):
+    assert index.resolve('🐠', 'Clownfish', 'Amphiprion ocellaris') is None
+    assert index.misses == 1
+
+
+def test_upsert_reindexes_edited_life(index):
+    index.upsert(SimpleNamespace(id='clown', emoji='🐠', common_name='Clownfish', scientific_name='Amphiprion ocellaris'))
+    assert index.resolve('🐠', 'Clownfish', 'Amphiprion ocellaris') == 'clown'
+    assert index.resolve('🐠', '', '') is None
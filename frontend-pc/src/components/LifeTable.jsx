@@ -58,7 +58,7 @@ const LifeTable = () => {
               <td>{l.common_name}</td>
               <td><i>{l.scientific_name}</i></td>
               <td>{formatLastSeen(l.last_seen_at)}</td>
-              <td>{l.image_refs.length}</td>
+              <td>{l.sighting_count}</td>
             </tr>
           ))}
         </tbody>